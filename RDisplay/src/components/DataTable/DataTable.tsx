@@ -308,9 +308,9 @@ export const DataTable: React.FC<DataTableProps> = ({
 
     const formatTimestamp = (timestamp: string): string => {
         try {
-            // Parse timestamp format: "dd.mm.yyyy hh:mm:ss"
-            const [date, time] = timestamp.split(" ");
-            const [day, month, year] = date.split(".");
+            // Parse timestamp format: "yyyy-mm-ddThh:mm:ss" (normalized by csvParser)
+            const [date, time] = timestamp.split("T");
+            const [year, month, day] = date.split("-");
             const [hour, minute] = time.split(":");
 
             // Return in European format: DD.MM.YYYY, HH:MM
@@ -23,6 +23,34 @@ export interface DealSection {
   deals: Deal[];
 }
 
+export interface CheapestDeparture {
+  country: string;
+  trip: string;
+  persons: number;
+  dateRange: string;
+  airport: string;
+  currentPrice: number;
+  maxPrice: number;
+  spread: number;
+  spreadPercent: number;
+  airportCount: number;
+  csvFileName: string;
+  offerUrl: string;
+}
+
+/** data/cheapest-departures.json */
+export interface CheapestDepartures {
+  generatedAt: string;
+  label: string;
+  stats: {
+    terms: number;
+    multiAirportTerms: number;
+    averageSpreadPercent: number;
+    maxSpreadPercent: number;
+  };
+  entries: CheapestDeparture[];
+}
+
 export interface DealsData {
   generatedAt: string;
   sections: {
@@ -3,7 +3,9 @@
  */
 
 import type { CsvData, TripTerm, PriceEntry, ParsedCsvRow } from '../types/csvData';
-import { parseDateFromTerm, parseEndDateFromTerm, isTripPast, groupTermsByYear } from './dateUtils';
+import {
+  parseDateFromTerm, parseEndDateFromTerm, isTripPast, groupTermsByYear, toIsoTimestamp, CSV_HEADER_VERSION
+} from './dateUtils';
 import { configManager } from './configManager';
 
 /**
@@ -16,9 +18,11 @@ export const parseCsvContent = async (csvContent: string, fileName: string): Pro
     throw new Error('Invalid CSV format: insufficient data');
   }
 
-  // Parse header row (timestamps)
-  const headerRow = lines[0].split(',');
-  const originalTimestamps = headerRow.slice(1); // Skip first empty column
+  // Parse header row (timestamps); the first cell is the header version, empty for legacy files
+  const headerRow = lines[0].trim().split(',');
+  const originalTimestamps = headerRow[0] === CSV_HEADER_VERSION
+    ? headerRow.slice(1)
+    : headerRow.slice(1).map(toIsoTimestamp);
 
   // Create timestamp-index pairs for sorting
   const timestampIndexPairs = originalTimestamps.map((timestamp, index) => ({
@@ -26,27 +30,10 @@ export const parseCsvContent = async (csvContent: string, fileName: string): Pro
     originalIndex: index
   }));
 
-  // Sort timestamps from newest to oldest
-  timestampIndexPairs.sort((a, b) => {
-    // Parse timestamps in format "dd.mm.yyyy hh:mm:ss"
-    const parseTimestamp = (ts: string): Date => {
-      const [date, time] = ts.split(' ');
-      const [day, month, year] = date.split('.');
-      const [hour, minute, second] = time.split(':');
-      return new Date(
-        parseInt(year, 10),
-        parseInt(month, 10) - 1, // Month is 0-based
-        parseInt(day, 10),
-        parseInt(hour, 10),
-        parseInt(minute, 10),
-        parseInt(second, 10)
-      );
-    };
-
-    const dateA = parseTimestamp(a.timestamp);
-    const dateB = parseTimestamp(b.timestamp);
-    return dateB.getTime() - dateA.getTime(); // Newest first
-  });
+  // Sort timestamps from newest to oldest; ISO-8601 timestamps sort as strings
+  timestampIndexPairs.sort((a, b) =>
+    a.timestamp < b.timestamp ? 1 : a.timestamp > b.timestamp ? -1 : 0
+  );
 
   // Extract sorted timestamps and create mapping
   const timestamps = timestampIndexPairs.map(pair => pair.timestamp);
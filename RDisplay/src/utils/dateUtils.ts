@@ -3,6 +3,21 @@
  * Based on RScraper's processor.py date logic
  */
 
+/**
+ * Version cell of the current CSV header format (ISO-8601 timestamps)
+ */
+export const CSV_HEADER_VERSION = 'v2';
+
+/**
+ * Convert a header timestamp to ISO-8601 "yyyy-mm-ddThh:mm:ss", which sorts as a string.
+ * Legacy "dd.mm.yyyy hh:mm:ss" timestamps (headers without a version cell) are rearranged.
+ */
+export const toIsoTimestamp = (timestamp: string): string => {
+  const ts = timestamp.trim();
+  const legacy = /^(\d{2})\.(\d{2})\.(\d{4}) (\d{2}:\d{2}:\d{2})$/.exec(ts);
+  return legacy ? `${legacy[3]}-${legacy[2]}-${legacy[1]}T${legacy[4]}` : ts;
+};
+
 /**
  * Parse date from term format "dd.mm.yyyy - dd.mm.yyyy"
  */
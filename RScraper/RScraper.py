@@ -1,8 +1,19 @@
 import os
+import json
+import time
+import argparse
 import subprocess
-from scraper import get_all_departures_with_prices
-from processor import process_data
-from config_manager import load_and_generate_combinations, generate_file_name
+from datetime import datetime
+from scraper import fetch_trip_departures, fetch_departure_prices, DELAY_BETWEEN_API_CALLS
+from processor import process_data, get_current_timestamp
+from config_manager import load_and_generate_combinations, join_file_name, parse_shard_spec, select_shard
+from run_journal import RunJournal, JOURNAL_FILE_NAME
+from merge_shards import get_shard_journal_name, write_shard_manifest
+from scheduler import ScrapeScheduler
+from price_events import get_events_file, prune_events
+from response_archive import ResponseArchive, DEFAULT_ARCHIVE_DIR
+from negative_cache import NegativeCache, get_negative_cache_file
+from write_behind import WriteBehindWriter
 
 # Get the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,49 +21,272 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # Get the parent directory (one level up)
 parent_dir = os.path.dirname(script_dir)
 
-if __name__ == "__main__":
-    json_file_name = "sources.json"
 
-    # The JSON file is located in the parent directory
-    json_file_path = os.path.join(parent_dir, json_file_name)
+def get_unit_key(details, departure_name):
+    """Journal key of a (trip, person count, departure) unit — its CSV file name."""
+    return join_file_name(details["file_prefix"], departure_name, details["person_count"])
+
+
+def save_departure_results(details, departure_name, results, data_dir, journal, timestamp=None):
+    """Merge scraped results into the departure's CSV file and record the unit as done."""
+    file_name = get_unit_key(details, departure_name)
+
+    print(f"\nFound {len(results)} departure dates for {file_name}:")
+    for term, price in results:
+        print(f"  {term}: {price} zł")
+
+    file_path = os.path.join(data_dir, f"{file_name}.csv")
+    print(f"Saving data to: {file_path}")
+
+    changed = process_data(results, file_path, timestamp=timestamp)
+    journal.mark_done(file_name, file_path, len(results), changed)
+
+
+def scrape_departure(name, details, departure, data_dir, journal, writer, retry_queue, catalog=None, archive=None,
+                     negative_cache=None):
+    """Scrape a single departure; on failure the unit is deferred to the retry queue.
+
+    Merging the results and every journal, cache and archive update is handed to the
+    writer stage, so the next request does not wait for the disk. With a response
+    archive, the raw kalkulator response is stored under the same timestamp as the CSV
+    column, so the file can be rebuilt from the archive. With a negative cache, a
+    departure without terms is recorded as a miss.
+    """
+    departure_name = departure["Nazwa"]
+    timestamp = get_current_timestamp()
+    on_response = None
+    if archive:
+        unit_key = get_unit_key(details, departure_name)
+        on_response = lambda response: writer.submit(archive.add, unit_key, details, departure, timestamp, response)
+    try:
+        results = fetch_departure_prices(
+            details["link"], details["age_param"], details["person_count"], departure, on_response,
+        )
+    except Exception as e:
+        print(f"    Error fetching data for {departure_name}: {e}")
+        writer.submit(journal.mark_failed, get_unit_key(details, departure_name), e)
+        retry_queue.append((name, details, departure))
+        if catalog:
+            catalog.invalidate(details["link"])
+        return
+
+    print(f"    Found {len(results)} departure dates")
+    if negative_cache:
+        if results:
+            writer.submit(negative_cache.record_hit, get_unit_key(details, departure_name))
+        else:
+            writer.submit(negative_cache.record_miss, get_unit_key(details, departure_name))
+    writer.submit(save_departure_results, details, departure_name, results, data_dir, journal, timestamp)
+
+
+def scrape_trip(name, details, data_dir, journal, writer, retry_queue, scheduler=None, catalog=None, archive=None,
+                negative_cache=None):
+    """Scrape all departures of a trip combination that are not yet done in the journal.
+
+    With a scheduler, only departures it selects for this run are scraped. With a
+    departure catalog, the trip page is only fetched when its cached entry expired.
+    Departures in the negative cache are skipped until their next re-check.
+    """
+    try:
+        if catalog:
+            departures = catalog.get_departures(details["link"])
+        else:
+            departures = fetch_trip_departures(details["link"])
+    except Exception as e:
+        print(f"Error reading data for {name}: {e}")
+        writer.submit(journal.record_trip_failed, name, e)
+        retry_queue.append((name, details, None))
+        return
+
+    writer.submit(journal.record_departures, name, [d["Nazwa"] for d in departures])
+
+    pending = [d for d in departures if not journal.is_done(get_unit_key(details, d["Nazwa"]))]
+    if len(pending) < len(departures):
+        print(f"Skipping {len(departures) - len(pending)} departures already done in this run")
+
+    if negative_cache:
+        # Units that failed in a resumed run are always requested again
+        rechecked = [
+            d for d in pending
+            if journal.is_failed(get_unit_key(details, d["Nazwa"]))
+            or negative_cache.should_scrape(get_unit_key(details, d["Nazwa"]))
+        ]
+        if len(rechecked) < len(pending):
+            print(f"Skipping {len(pending) - len(rechecked)} departures without terms until their next re-check")
+        pending = rechecked
+
+    if scheduler:
+        scheduled = [d for d in pending if scheduler.should_scrape(get_unit_key(details, d["Nazwa"]))]
+        if len(scheduled) < len(pending):
+            print(f"Skipping {len(pending) - len(scheduled)} departures not due for a refresh")
+        pending = scheduled
+
+    for i, departure in enumerate(pending):
+        print(f"\n  [{i+1}/{len(pending)}] Departure: {departure['Nazwa']}")
+        scrape_departure(name, details, departure, data_dir, journal, writer, retry_queue, catalog, archive,
+                         negative_cache)
+
+        # Be polite to the server
+        if i < len(pending) - 1:
+            time.sleep(DELAY_BETWEEN_API_CALLS)
+
+
+def is_trip_done(name, details, journal):
+    """Check whether every known departure of a trip combination is already done."""
+    departure_names = journal.get_departures(name)
+    if departure_names is None:
+        return False
+    return all(journal.is_done(get_unit_key(details, d)) for d in departure_names)
+
+
+def reload_departure(details, departure, catalog):
+    """Look a failed departure up again in its trip's departure list.
+
+    The catalog entry of the trip was invalidated when the departure failed, so this
+    fetches the trip page again and picks up a changed UnikalnyKluczOferty. Returns None
+    if the page cannot be read or no longer lists the departure.
+    """
+    try:
+        departures = catalog.get_departures(details["link"])
+    except Exception as e:
+        print(f"    Error reading departures of {details['link']}: {e}")
+        return None
+    return next((d for d in departures if d["Nazwa"] == departure["Nazwa"]), None)
+
+
+def process_retry_queue(retry_queue, data_dir, journal, writer, scheduler=None, catalog=None, archive=None,
+                        negative_cache=None):
+    """Retry deferred trips and departures once, after all other work is done.
+
+    With a departure catalog, failed departures are retried with their entry from a
+    freshly fetched trip page rather than the cached one they failed with.
+    """
+    if not retry_queue:
+        return
 
+    print(f"\n{'='*70}")
+    print(f"Retrying {len(retry_queue)} deferred units...")
+    print(f"{'='*70}")
+
+    # Failures during the retry pass are recorded in the journal but not queued again
+    final_failures = []
+    for name, details, departure in retry_queue:
+        time.sleep(DELAY_BETWEEN_API_CALLS)
+        if departure is None:
+            print(f"\nRetrying trip {name}...")
+            scrape_trip(name, details, data_dir, journal, writer, final_failures, scheduler, catalog, archive,
+                        negative_cache)
+        else:
+            print(f"\nRetrying {name} departure {departure['Nazwa']}...")
+            if catalog:
+                fresh = reload_departure(details, departure, catalog)
+                if fresh is None:
+                    # Still failed in the journal, --resume retries it
+                    print(f"    {departure['Nazwa']} is not available on the trip page, not retried")
+                    continue
+                departure = fresh
+            scrape_departure(name, details, departure, data_dir, journal, writer, final_failures, catalog, archive,
+                             negative_cache)
+
+
+def print_run_summary(journal, negative_cache=None):
+    counts = journal.summary()
+    print(f"\n{'='*70}")
+    print("Run summary:")
+    print(f"  Units done:   {counts['done']} ({counts['done'] - journal.changed_count()} unchanged)")
+    print(f"  Units failed: {counts['failed']}")
+    for unit_key in journal.failed_units():
+        print(f"    - {unit_key}")
+    if counts['failed']:
+        print("  Run again with --resume to retry only the failed units.")
+    if negative_cache:
+        negative_cache.print_summary()
+
+
+def run_scrape(json_file_path, data_dir, resume=False, shard=None, schedule=False, budget=None,
+               url_data=None, catalog=None, archive_dir=None):
+    """Scrape all trip combinations into CSV files, recording progress in the run journal.
+
+    With shard=(i, N), only the combinations assigned to shard i of N are scraped and
+    a shard manifest is written for merge_shards.py. With schedule=True, only files due
+    for a refresh are scraped, at most `budget` kalkulator requests per run. Long-running
+    callers pass already loaded combinations and a departure catalog to skip cold work.
+    With archive_dir, every raw kalkulator response is kept in the response archive.
+    Results are merged into the CSV files by a write-behind stage while fetching goes on.
+
+    Returns the number of units whose CSV file was written with new prices.
+    """
     # Load configuration and generate all trip combinations
-    url_data = load_and_generate_combinations(json_file_path)
+    if url_data is None:
+        url_data = load_and_generate_combinations(json_file_path)
+
+    journal_name = JOURNAL_FILE_NAME
+    if shard:
+        shard_index, shard_count = shard
+        url_data = select_shard(url_data, shard_index, shard_count)
+        journal_name = get_shard_journal_name(shard_index, shard_count)
+        print(f"Shard {shard_index}/{shard_count}: {len(url_data)} trip combinations")
 
-    # Ensure the "data" directory exists in the parent directory
-    data_dir = os.path.join(parent_dir, "data")
+    # Ensure the data directory exists
     os.makedirs(data_dir, exist_ok=True)
 
-    for name, details in url_data.items():
-        link = details["link"]
-        country = details["country"]
-        trip_name = details["trip_name"]
-        person_count = details["person_count"]
-        age_param = details["age_param"]
+    journal = RunJournal.start(os.path.join(data_dir, journal_name), resume)
+    retry_queue = []
+    archive = ResponseArchive(archive_dir) if archive_dir else None
+    negative_cache = NegativeCache.load(get_negative_cache_file(data_dir))
 
-        print(f"\n{'='*70}")
-        print(f"Reading data for {name}...")
-        print(f"{'='*70}")
+    scheduler = None
+    if schedule:
+        scheduler = ScrapeScheduler.from_data_dir(data_dir, budget)
+        scheduler.print_plan()
 
-        try:
-            all_departures = get_all_departures_with_prices(link, age_param, person_count)
-        except Exception as e:
-            print(f"Error reading data for {name}: {e}")
-            continue
+    # Fetching runs here, merging and writing on the writer thread; leaving the block
+    # flushes all pending writes, also when the run stops on an error
+    with WriteBehindWriter() as writer:
+        for name, details in url_data.items():
+            print(f"\n{'='*70}")
+            print(f"Reading data for {name}...")
+            print(f"{'='*70}")
+
+            if is_trip_done(name, details, journal):
+                print(f"All departures of {name} are already done in this run, skipping")
+                continue
+
+            if scheduler and not scheduler.has_work(details["file_prefix"], details["person_count"]):
+                print(f"No departures of {name} are due for a refresh, skipping")
+                continue
+
+            scrape_trip(name, details, data_dir, journal, writer, retry_queue, scheduler, catalog, archive,
+                        negative_cache)
+
+        process_retry_queue(retry_queue, data_dir, journal, writer, scheduler, catalog, archive, negative_cache)
 
-        for departure_name, results in all_departures.items():
-            file_name = generate_file_name(country, trip_name, departure_name, person_count)
+    journal.finish()
+    print_run_summary(journal, negative_cache)
+    if scheduler:
+        scheduler.print_summary()
 
-            print(f"\nFound {len(results)} departure dates for {file_name}:")
-            for term, price in results:
-                print(f"  {term}: {price} zł")
+    pruned = prune_events(get_events_file(data_dir))
+    if pruned:
+        print(f"Pruned {pruned} price change events older than the retention window")
 
-            file_path = os.path.join(data_dir, f"{file_name}.csv")
-            print(f"Saving data to: {file_path}")
+    if shard:
+        write_shard_manifest(data_dir, shard_index, shard_count, journal)
 
-            process_data(results, file_path)
+    return journal.changed_count()
 
-    # After scraping all data, generate deals
+
+def deals_generated_today(data_dir):
+    """True if deals.json in data_dir was generated today (past terms only drop out daily)."""
+    try:
+        with open(os.path.join(data_dir, "deals.json"), 'r', encoding='utf-8') as f:
+            generated_at = json.load(f).get("generatedAt", "")
+    except (OSError, ValueError):
+        return False
+    return generated_at[:10] == datetime.now().date().isoformat()
+
+
+def run_generate_deals():
     print(f"\n{'='*70}")
     print("Running deal generation script...")
 
@@ -62,3 +296,56 @@ if __name__ == "__main__":
     else:
         print(f"Warning: Deal generator script not found at {generate_deals_script}")
 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape r.pl trip prices into CSV files in data/.")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue the last unfinished run, scraping only missing or failed units",
+    )
+    parser.add_argument(
+        "--shard", metavar="i/N",
+        help="scrape only shard i of N (0 <= i < N); deals are generated after merge_shards.py",
+    )
+    parser.add_argument("--data-dir", help="directory for the CSV files (default: ../data)")
+    parser.add_argument(
+        "--schedule", action="store_true",
+        help="scrape only departures due for a refresh based on their price volatility and proximity",
+    )
+    parser.add_argument(
+        "--budget", type=int, metavar="N",
+        help="maximum number of kalkulator requests per run (implies --schedule)",
+    )
+    parser.add_argument(
+        "--archive-dir", nargs="?", const=DEFAULT_ARCHIVE_DIR, metavar="DIR",
+        help="archive the raw kalkulator responses in DIR (default: ../archive); off unless given",
+    )
+    args = parser.parse_args()
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard_spec(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    json_file_name = "sources.json"
+
+    # The JSON file is located in the parent directory
+    json_file_path = os.path.join(parent_dir, json_file_name)
+
+    # The "data" directory is located in the parent directory
+    data_dir = args.data_dir or os.path.join(parent_dir, "data")
+
+    changed = run_scrape(
+        json_file_path, data_dir, resume=args.resume, shard=shard,
+        schedule=args.schedule or args.budget is not None, budget=args.budget,
+        archive_dir=args.archive_dir,
+    )
+
+    # After scraping all data, generate deals; sharded runs leave this to the merge step
+    if not shard:
+        if changed or not deals_generated_today(data_dir):
+            run_generate_deals()
+        else:
+            print("\nNo prices changed and deals.json is from today, skipping deal generation")
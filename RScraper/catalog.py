@@ -0,0 +1,125 @@
+"""
+Compiled sources catalog — everything derived from sources.json, computed once per
+version of the file and shared by RScraper.py, config_manager.py and generate_deals.py.
+
+The catalog holds the trip combinations (with the Country__Trip_Name prefix of their CSV
+file names), the offer URL per trip and person count, and the reverse mapping
+from transliterated trip names back to sources.json entries. It is cached in
+.cache/ under the SHA-256 of the sources.json content, so an unchanged configuration
+is never compiled twice and any edit produces a fresh catalog.
+"""
+import os
+import sys
+import json
+import hashlib
+from config_manager import transliterate_polish, build_url, generate_trip_combinations
+
+CATALOG_VERSION = 2
+DEFAULT_AGE_PARAM = '1995-01-01'
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+
+def compile_catalog(config_data, sources_hash):
+    """Build the catalog dict from parsed sources.json content."""
+    age_param = config_data.get('global_config', {}).get('age_param', DEFAULT_AGE_PARAM)
+    default_person_counts = config_data.get('defaults', {}).get('person_counts', [1, 2])
+
+    trips = {}
+    trips_by_file_name = {}
+    for trip_name, details in config_data.get('trips', {}).items():
+        file_name = transliterate_polish(trip_name)
+        person_counts = details.get('person_counts', default_person_counts)
+        trips[trip_name] = {
+            'country': details.get('country', ''),
+            'baseUrl': details.get('base_url', ''),
+            'offerUrls': {
+                str(persons): build_url(details['base_url'], persons, age_param)
+                for persons in person_counts
+            } if details.get('base_url') else {},
+        }
+        # First match wins, like the linear search this replaces
+        trips_by_file_name.setdefault(file_name, trip_name)
+
+    return {
+        'version': CATALOG_VERSION,
+        'sourcesHash': sources_hash,
+        'ageParam': age_param,
+        'combinations': generate_trip_combinations(config_data),
+        'trips': trips,
+        'tripsByFileName': trips_by_file_name,
+    }
+
+
+class SourcesCatalog:
+    """Read-only lookups over a compiled catalog."""
+
+    def __init__(self, data):
+        self.data = data
+        self.trips = data['trips']
+        self.trips_by_file_name = data['tripsByFileName']
+        self.age_param = data['ageParam']
+
+    @property
+    def sources_hash(self):
+        return self.data['sourcesHash']
+
+    @property
+    def combinations(self):
+        return self.data['combinations']
+
+    def find_trip(self, transliterated_name):
+        """Return (trip name, country, base URL) for a trip name as used in CSV file names, or None."""
+        trip_name = self.trips_by_file_name.get(transliterated_name)
+        if trip_name is None:
+            return None
+        trip = self.trips[trip_name]
+        return trip_name, trip['country'], trip['baseUrl']
+
+    def offer_url(self, trip_name, persons):
+        """Return the r.pl offer URL of a trip for a person count, or None for unknown trips."""
+        trip = self.trips.get(trip_name)
+        if not trip or not trip['baseUrl']:
+            return None
+        url = trip['offerUrls'].get(str(persons))
+        return url or build_url(trip['baseUrl'], persons, self.age_param)
+
+
+def get_sources_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_catalog(json_file_path, cache_dir=CACHE_DIR):
+    """Load the compiled catalog of a sources.json file, compiling and caching it if needed."""
+    with open(json_file_path, 'rb') as f:
+        content = f.read()
+    sources_hash = get_sources_hash(content)
+
+    cache_file = os.path.join(cache_dir, f"catalog-{sources_hash[:16]}.json")
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CATALOG_VERSION and data.get('sourcesHash') == sources_hash:
+                return SourcesCatalog(data)
+        except (OSError, ValueError):
+            pass  # Corrupt cache entry, compile again
+
+    # Progress goes to stderr, query_prices.py prints its JSON results to stdout
+    print(f"Compiling sources catalog from: {json_file_path}", file=sys.stderr)
+    data = compile_catalog(json.loads(content.decode('utf-8')), sources_hash)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Stale catalogs of earlier sources.json versions are not needed anymore
+        for name in os.listdir(cache_dir):
+            if name.startswith('catalog-') and name.endswith('.json'):
+                os.remove(os.path.join(cache_dir, name))
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        # The cache is an optimization only, e.g. on a read-only checkout
+        print(f"Warning: could not cache sources catalog: {e}", file=sys.stderr)
+
+    return SourcesCatalog(data)
@@ -3,8 +3,11 @@ Configuration manager for RScraper — handles sources.json processing and trip
 """
 import os
 import json
+import hashlib
+from functools import lru_cache
 
 
+@lru_cache(maxsize=4096)  # Bounded, query_prices.py passes every request parameter through
 def transliterate_polish(text):
     """Convert Polish characters to ASCII equivalents and replace spaces with underscores"""
     polish_chars = {
@@ -39,13 +42,19 @@ def build_url(base_url, person_count, age_param):
     return f"{base_url}?czyCenaZaWszystkich=1&{age_params}&liczbaPokoi=1"
 
 
+def generate_file_prefix(country, trip_name):
+    """Generate the Country__Trip_Name part of the file names of a trip"""
+    return f"{transliterate_polish(country)}__{transliterate_polish(trip_name)}"
+
+
+def join_file_name(file_prefix, departure, person_count):
+    """Complete a trip's file name prefix with a departure and person count"""
+    return f"{file_prefix}__{transliterate_polish(departure)}__{person_count}os"
+
+
 def generate_file_name(country, trip_name, departure, person_count):
     """Generate file name following the convention: Country__Trip_Name__Departure__XPersons"""
-    country_clean = transliterate_polish(country)
-    trip_name_clean = transliterate_polish(trip_name)
-    departure_clean = transliterate_polish(departure)
-
-    return f"{country_clean}__{trip_name_clean}__{departure_clean}__{person_count}os"
+    return join_file_name(generate_file_prefix(country, trip_name), departure, person_count)
 
 
 def load_config(json_file_path):
@@ -73,11 +82,12 @@ def generate_trip_combinations(config_data):
 
         # Use trip-specific values or fall back to defaults
         person_counts = trip_details.get('person_counts', default_person_counts)
+        file_prefix = generate_file_prefix(country, trip_name)
 
         # Generate combinations for each person count (departure is dynamic now)
         for person_count in person_counts:
             # Key without departure — departure will be added during scraping
-            key_name = generate_file_name(country, trip_name, "ALL", person_count)
+            key_name = join_file_name(file_prefix, "ALL", person_count)
 
             # Build the URL
             url = build_url(base_url, person_count, age_param)
@@ -89,15 +99,52 @@ def generate_trip_combinations(config_data):
                 "trip_name": trip_name,
                 "person_count": person_count,
                 "age_param": age_param,
+                "base_url": base_url,
+                "file_prefix": file_prefix,
             }
 
     return combinations
 
 
+def parse_shard_spec(spec):
+    """Parse a shard spec 'i/N' into (shard_index, shard_count), where 0 <= i < N"""
+    try:
+        index_str, count_str = spec.split('/')
+        shard_index, shard_count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard spec '{spec}', expected 'i/N'")
+
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard spec '{spec}', expected 0 <= i < N")
+
+    return shard_index, shard_count
+
+
+def get_shard_index(base_url, shard_count):
+    """Assign a trip to a shard using a stable hash of its base URL.
+
+    All person counts of a trip share the same base URL, so a trip's files never
+    end up split between shards.
+    """
+    digest = hashlib.sha1(base_url.encode('utf-8')).hexdigest()
+    return int(digest, 16) % shard_count
+
+
+def select_shard(combinations, shard_index, shard_count):
+    """Return only the combinations that belong to the given shard"""
+    return {
+        name: details for name, details in combinations.items()
+        if get_shard_index(details['base_url'], shard_count) == shard_index
+    }
+
+
 def load_and_generate_combinations(json_file_path):
-    """Load configuration from JSON file and generate all trip combinations"""
-    config_data = load_config(json_file_path)
-    combinations = generate_trip_combinations(config_data)
+    """Load all trip combinations from the compiled catalog of the JSON file"""
+    # Imported here, catalog.py builds on the functions of this module
+    from catalog import load_catalog
+
+    print(f"Reading configuration from JSON file: {json_file_path}")
+    combinations = load_catalog(json_file_path).combinations
 
     print(f"Generated {len(combinations)} trip combinations from configuration")
     print("Trip combinations:")
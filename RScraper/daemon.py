@@ -0,0 +1,170 @@
+"""
+Long-running daemon mode for RScraper — runs scrape cycles on an internal schedule
+without paying the cold-start cost of a new process every time.
+
+Kept warm between cycles:
+- the HTTP session of scraper.py (pooled connections to r.pl),
+- the departure catalog (trip pages are re-fetched every other scheduled cycle),
+- the compiled sources catalog and trip combinations (reloaded only when sources.json changes).
+
+Deal generation keeps no per-file state between cycles, so its memory stays bounded by
+the largest trip; unchanged CSV files are read from the price-matrix cache instead of
+being re-parsed.
+
+An immediate cycle can be triggered by creating the trigger file or sending SIGUSR1.
+SIGINT / SIGTERM stop the daemon after the current cycle.
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+from datetime import datetime, timedelta
+from scraper import DepartureCatalog
+from config_manager import load_and_generate_combinations
+from catalog import load_catalog
+from RScraper import run_scrape, deals_generated_today, parent_dir
+from response_archive import DEFAULT_ARCHIVE_DIR
+
+sys.path.insert(0, parent_dir)
+import generate_deals
+
+DEFAULT_INTERVAL_HOURS = 24
+# Added to the interval for the departure catalog TTL: the next cycle starts one interval
+# after the previous one ended, so lists fetched during a cycle (of up to this many hours)
+# are still valid in the next one and fetched again every other cycle
+DEPARTURE_CATALOG_MARGIN_HOURS = 12
+POLL_INTERVAL = 5  # seconds between checks of the trigger file and signals
+
+
+class ScraperDaemon:
+    def __init__(self, json_file_path, data_dir, trigger_file, interval_hours,
+                 schedule=False, budget=None, archive_dir=None):
+        self.json_file_path = json_file_path
+        self.data_dir = data_dir
+        self.trigger_file = trigger_file
+        self.interval = timedelta(hours=interval_hours)
+        self.schedule = schedule
+        self.budget = budget
+        self.archive_dir = archive_dir
+
+        self.catalog = DepartureCatalog(
+            ttl=(self.interval + timedelta(hours=DEPARTURE_CATALOG_MARGIN_HOURS)).total_seconds())
+        self.config_mtime = None
+        self.url_data = None
+        self.sources_catalog = None
+
+        self.triggered = False
+        self.stopping = False
+
+    # --- Signals and triggers ---
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        # SIGUSR1 is not available on Windows, the trigger file works everywhere
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self._handle_trigger)
+
+    def _handle_stop(self, signum, frame):
+        print(f"\nReceived signal {signum}, stopping after the current cycle...")
+        self.stopping = True
+
+    def _handle_trigger(self, signum, frame):
+        print(f"\nReceived signal {signum}, triggering an immediate cycle...")
+        self.triggered = True
+
+    def consume_trigger(self):
+        """Return True if an immediate cycle was requested, clearing the request."""
+        if os.path.exists(self.trigger_file):
+            os.remove(self.trigger_file)
+            print(f"\nFound trigger file {self.trigger_file}, triggering an immediate cycle...")
+            self.triggered = True
+
+        triggered = self.triggered
+        self.triggered = False
+        return triggered
+
+    # --- Cycles ---
+
+    def reload_config_if_changed(self):
+        mtime = os.path.getmtime(self.json_file_path)
+        if mtime == self.config_mtime:
+            return
+
+        print("Configuration changed, reloading...")
+        self.url_data = load_and_generate_combinations(self.json_file_path)
+        self.sources_catalog = load_catalog(self.json_file_path)
+        self.config_mtime = mtime
+
+    def run_cycle(self):
+        started_at = datetime.now()
+        print(f"\n{'#'*70}")
+        print(f"Daemon cycle started at {started_at.strftime('%d.%m.%Y %H:%M:%S')}")
+        print(f"{'#'*70}")
+
+        self.reload_config_if_changed()
+        changed = run_scrape(
+            self.json_file_path, self.data_dir, schedule=self.schedule, budget=self.budget,
+            url_data=self.url_data, catalog=self.catalog, archive_dir=self.archive_dir,
+        )
+
+        print(f"\n{'='*70}")
+        if changed or not deals_generated_today(self.data_dir):
+            print("Regenerating deals...")
+            generate_deals.generate_deals(self.sources_catalog, self.data_dir)
+        else:
+            print("No prices changed and deals are from today, skipping deal generation")
+
+        print(f"\nDaemon cycle finished in {datetime.now() - started_at}")
+
+    def run(self):
+        self.install_signal_handlers()
+        print(f"RScraper daemon started: interval {self.interval}, trigger file {self.trigger_file}")
+
+        next_cycle = datetime.now()
+        while not self.stopping:
+            if self.consume_trigger() or datetime.now() >= next_cycle:
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    # Keep the daemon alive; the next cycle starts from a fresh journal
+                    print(f"Error during daemon cycle: {e}")
+                next_cycle = datetime.now() + self.interval
+                print(f"Next cycle at {next_cycle.strftime('%d.%m.%Y %H:%M:%S')}")
+                continue
+
+            time.sleep(POLL_INTERVAL)
+
+        print("RScraper daemon stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run RScraper as a long-running daemon.")
+    parser.add_argument(
+        "--interval-hours", type=float, default=DEFAULT_INTERVAL_HOURS,
+        help=f"hours between scrape cycles (default: {DEFAULT_INTERVAL_HOURS})",
+    )
+    parser.add_argument(
+        "--trigger-file", default=os.path.join(parent_dir, "daemon.trigger"),
+        help="create this file to trigger an immediate cycle (default: ../daemon.trigger)",
+    )
+    parser.add_argument("--data-dir", help="directory for the CSV files (default: ../data)")
+    parser.add_argument("--schedule", action="store_true", help="scrape only departures due for a refresh")
+    parser.add_argument("--budget", type=int, metavar="N", help="maximum kalkulator requests per cycle")
+    parser.add_argument(
+        "--archive-dir", nargs="?", const=DEFAULT_ARCHIVE_DIR, metavar="DIR",
+        help="archive the raw kalkulator responses in DIR (default: ../archive); off unless given",
+    )
+    args = parser.parse_args()
+
+    daemon = ScraperDaemon(
+        json_file_path=os.path.join(parent_dir, "sources.json"),
+        data_dir=args.data_dir or os.path.join(parent_dir, "data"),
+        trigger_file=args.trigger_file,
+        interval_hours=args.interval_hours,
+        schedule=args.schedule or args.budget is not None,
+        budget=args.budget,
+        archive_dir=args.archive_dir,
+    )
+    daemon.run()
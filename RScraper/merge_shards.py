@@ -0,0 +1,207 @@
+"""
+Shard merging for RScraper — combines the CSV outputs of several `RScraper.py --shard i/N`
+runs into a single data directory.
+
+Each shard run writes a manifest listing the CSV files it produced. Shards are disjoint
+by construction, so merging only copies the listed files; a file claimed by two
+manifests is reported as a conflict and nothing is copied.
+"""
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+from price_events import get_events_file, iter_events, append_events
+from price_csv import timestamp_sort_key
+from scrape_state import get_state_file, load_scrape_state, save_scrape_state
+from negative_cache import NegativeCache, get_negative_cache_file
+
+MANIFEST_PATTERN = "shard-*-of-*.json"
+
+
+def get_manifest_name(shard_index, shard_count):
+    return f"shard-{shard_index}-of-{shard_count}.json"
+
+
+def get_shard_journal_name(shard_index, shard_count):
+    return f"run-journal-shard-{shard_index}-of-{shard_count}.json"
+
+
+def write_shard_manifest(data_dir, shard_index, shard_count, journal):
+    """Write the list of CSV files completed by this shard run."""
+    files = sorted(
+        unit["file"] for unit in journal.state["units"].values()
+        if unit["status"] == "done"
+    )
+    manifest = {
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "started_at": journal.state["started_at"],
+        "files": files,
+    }
+
+    manifest_path = os.path.join(data_dir, get_manifest_name(shard_index, shard_count))
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"Shard manifest with {len(files)} files saved to: {manifest_path}")
+    return manifest_path
+
+
+def load_shard_manifests(shard_dirs):
+    """Find and load one manifest per shard directory.
+
+    Returns list of (shard_dir, manifest) tuples.
+    """
+    manifests = []
+    for shard_dir in shard_dirs:
+        paths = glob.glob(os.path.join(shard_dir, MANIFEST_PATTERN))
+        if len(paths) != 1:
+            raise ValueError(f"Expected exactly one shard manifest in {shard_dir}, found {len(paths)}")
+        with open(paths[0], 'r', encoding='utf-8') as f:
+            manifests.append((shard_dir, json.load(f)))
+    return manifests
+
+
+def check_manifests(manifests):
+    """Validate that the manifests describe disjoint shards of the same partitioning.
+
+    Returns dict: {file_name: shard_dir}
+    """
+    shard_counts = {m["shard_count"] for _, m in manifests}
+    if len(shard_counts) != 1:
+        raise ValueError(f"Shards come from different partitionings: N = {sorted(shard_counts)}")
+    shard_count = shard_counts.pop()
+
+    seen_indices = {}
+    owners = {}
+    for shard_dir, manifest in manifests:
+        shard_index = manifest["shard_index"]
+        if shard_index in seen_indices:
+            raise ValueError(f"Shard {shard_index}/{shard_count} found in both {seen_indices[shard_index]} and {shard_dir}")
+        seen_indices[shard_index] = shard_dir
+
+        for file_name in manifest["files"]:
+            if file_name in owners:
+                raise ValueError(f"Conflict: {file_name} written by both {owners[file_name]} and {shard_dir}")
+            owners[file_name] = shard_dir
+
+    missing = sorted(set(range(shard_count)) - set(seen_indices))
+    if missing:
+        print(f"Warning: missing shards {missing} of {shard_count}, their files keep their previous contents")
+
+    return owners
+
+
+def merge_shards(shard_dirs, data_dir):
+    """Copy every file listed in the shard manifests into the data directory."""
+    owners = check_manifests(load_shard_manifests(shard_dirs))
+    os.makedirs(data_dir, exist_ok=True)
+
+    for file_name, shard_dir in sorted(owners.items()):
+        source_path = os.path.join(shard_dir, file_name)
+        if not os.path.exists(source_path):
+            raise ValueError(f"{file_name} is listed in the manifest of {shard_dir} but does not exist")
+
+        target_path = os.path.join(data_dir, file_name)
+        if os.path.abspath(source_path) == os.path.abspath(target_path):
+            continue
+
+        # Copy next to the target first so a failed copy never leaves a truncated CSV
+        tmp_path = f"{target_path}.tmp"
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, target_path)
+
+    merge_shard_events(owners, data_dir)
+    merge_shard_scrape_state(owners, data_dir)
+    merge_shard_negative_cache(owners, data_dir)
+    print(f"Merged {len(owners)} files from {len(shard_dirs)} shards into {data_dir}")
+    return len(owners)
+
+
+def merge_shard_events(owners, data_dir):
+    """Append the new price-change events of the merged files to the event log of data_dir.
+
+    A shard's data directory starts as a copy of data/, so its log repeats the existing
+    history; only events newer than the newest event of the file already in the target
+    log are appended.
+    """
+    events_file = get_events_file(data_dir)
+    newest = {}
+    for event in iter_events(events_file):
+        key = timestamp_sort_key(event.get('timestamp', ''))
+        if key > newest.get(event.get('file'), ''):
+            newest[event.get('file')] = key
+
+    events = []
+    for shard_dir in sorted(set(owners.values())):
+        if os.path.abspath(shard_dir) == os.path.abspath(data_dir):
+            continue
+        events.extend(
+            event for event in iter_events(get_events_file(shard_dir))
+            if owners.get(event.get('file')) == shard_dir
+            and timestamp_sort_key(event.get('timestamp', '')) > newest.get(event['file'], '')
+        )
+    append_events(events_file, events)
+
+
+def merge_shard_scrape_state(owners, data_dir):
+    """Carry the scrape state entries of the merged files over to data_dir."""
+    state = load_scrape_state(get_state_file(data_dir))
+    changed = False
+    for shard_dir in sorted(set(owners.values())):
+        if os.path.abspath(shard_dir) == os.path.abspath(data_dir):
+            continue
+        for file_name, entry in load_scrape_state(get_state_file(shard_dir)).items():
+            if owners.get(file_name) == shard_dir:
+                state[file_name] = entry
+                changed = True
+    if changed:
+        save_scrape_state(get_state_file(data_dir), state)
+
+
+
+def merge_shard_negative_cache(owners, data_dir):
+    """Carry the negative cache changes of the shard runs over to data_dir.
+
+    Failed units are not listed in the manifests, so entries a shard added or updated
+    are detected by comparing with data_dir; entries of merged files that a shard no
+    longer has were removed by a successful scrape.
+    """
+    cache = NegativeCache.load(get_negative_cache_file(data_dir))
+    original = dict(cache.entries)
+    for shard_dir in sorted(set(owners.values())):
+        if os.path.abspath(shard_dir) == os.path.abspath(data_dir):
+            continue
+        shard_entries = NegativeCache.load(get_negative_cache_file(shard_dir)).entries
+        for unit_key, entry in shard_entries.items():
+            if entry != original.get(unit_key):
+                cache.entries[unit_key] = entry
+        for file_name, owner in owners.items():
+            unit_key = os.path.splitext(file_name)[0]
+            if owner == shard_dir and unit_key not in shard_entries:
+                cache.entries.pop(unit_key, None)
+    if cache.entries != original:
+        cache.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the outputs of sharded RScraper runs into data/.")
+    parser.add_argument("shard_dirs", nargs="+", help="data directories produced by the shard runs")
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"),
+        help="target data directory (default: ../data)",
+    )
+    parser.add_argument("--skip-deals", action="store_true", help="do not run generate_deals.py after merging")
+    args = parser.parse_args()
+
+    try:
+        merge_shards(args.shard_dirs, args.data_dir)
+    except ValueError as e:
+        print(f"Error merging shards: {e}")
+        sys.exit(1)
+
+    if not args.skip_deals:
+        from RScraper import run_generate_deals
+        run_generate_deals()
@@ -0,0 +1,97 @@
+"""
+One-shot migration of the price CSV files to the v2 header (see price_csv.py).
+
+Only the header line is rewritten: the version cell 'v2' replaces the empty first cell
+and every timestamp is converted to ISO-8601. Data rows and column order are kept
+byte for byte. Already migrated files are skipped, so the tool can be run repeatedly.
+Scrape state entries of migrated files get the new file size, so the unchanged-scrape
+fast path keeps working.
+
+Usage:
+    python migrate_csv_header.py [--data-dir ../data] [--dry-run]
+"""
+import os
+import argparse
+from price_csv import HEADER_VERSION, normalize_timestamp, timestamp_sort_key
+from scrape_state import get_state_file, load_scrape_state, save_scrape_state
+
+
+def migrate_header(header):
+    """Return the v2 header line for a v1 header line, or None if it is already v2."""
+    cells = header.split(',')
+    if cells[0] == HEADER_VERSION:
+        return None
+    unparsable = [ts for ts in cells[1:] if not timestamp_sort_key(ts)]
+    if unparsable:
+        raise ValueError(f"unparsable timestamps in header: {', '.join(unparsable[:3])}")
+    return ','.join([HEADER_VERSION] + [normalize_timestamp(ts) for ts in cells[1:]])
+
+
+def migrate_file(file_path, dry_run=False):
+    """Rewrite the header of a single CSV file; returns True if the file needed migration."""
+    with open(file_path, 'rb') as f:
+        first_line = f.readline()
+        content = first_line.decode('utf-8')
+        line_ending = content[len(content.rstrip('\r\n')):]
+        new_header = migrate_header(content.rstrip('\r\n'))
+        if new_header is None:
+            return False
+        if dry_run:
+            return True
+
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write((new_header + line_ending).encode('utf-8'))
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
+
+    os.replace(tmp_path, file_path)
+    return True
+
+
+def migrate_data_dir(data_dir, dry_run=False):
+    state_file = get_state_file(data_dir)
+    state = load_scrape_state(state_file)
+
+    migrated = []
+    failed = []
+    for file_name in sorted(os.listdir(data_dir)):
+        if not file_name.endswith('.csv'):
+            continue
+        file_path = os.path.join(data_dir, file_name)
+        try:
+            if not migrate_file(file_path, dry_run):
+                continue
+        except (OSError, ValueError) as e:
+            print(f"  Error migrating {file_name}: {e}")
+            failed.append(file_name)
+            continue
+
+        migrated.append(file_name)
+        entry = state.get(file_name)
+        if entry and not dry_run:
+            entry['size'] = os.path.getsize(file_path)
+            for key in ('writtenAt', 'seenAt'):
+                if entry.get(key):
+                    entry[key] = normalize_timestamp(entry[key])
+
+    if migrated and state and not dry_run:
+        save_scrape_state(state_file, state)
+
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"{action} {len(migrated)} CSV files in {data_dir} to the {HEADER_VERSION} header"
+          + (f", {len(failed)} failed" if failed else ""))
+    return migrated, failed
+
+
+if __name__ == "__main__":
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Migrate the price CSV files to the v2 (ISO-8601) header.")
+    parser.add_argument("--data-dir", default=os.path.join(parent_dir, "data"))
+    parser.add_argument("--dry-run", action="store_true", help="only report the files that need migration")
+    args = parser.parse_args()
+
+    migrate_data_dir(args.data_dir, args.dry_run)
@@ -0,0 +1,106 @@
+"""
+Negative-result cache for RScraper — remembers departures whose kalkulator request
+returned no terms (the trip does not exist for that departure), so they are re-checked
+with exponentially growing intervals instead of on every run. Failed requests are not
+cached; they stay failed in the run journal and are retried by --resume.
+
+Entries are keyed by CSV file name, which is unique per (trip, departure, person count):
+
+    {"reason": "empty", "misses": consecutive negative results,
+     "firstMissAt": ..., "checkedAt": ..., "nextCheckAt": ...}
+
+After the n-th consecutive miss a unit is skipped for BASE_RECHECK_DAYS * 2^(n-1) days,
+at most MAX_RECHECK_DAYS. A scrape that returns terms removes the entry.
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from price_csv import TIMESTAMP_FORMAT, parse_timestamp
+
+NEGATIVE_CACHE_FILE_NAME = "negative-cache.json"
+BASE_RECHECK_DAYS = 1
+MAX_RECHECK_DAYS = 32
+RECHECK_SLACK_HOURS = 2  # Daily runs do not start at exactly the same time
+
+REASON_EMPTY = "empty"
+
+
+def get_negative_cache_file(data_dir):
+    return os.path.join(data_dir, NEGATIVE_CACHE_FILE_NAME)
+
+
+def get_recheck_interval(misses):
+    """Days until the next check after `misses` consecutive negative results."""
+    return min(BASE_RECHECK_DAYS * 2 ** (max(misses, 1) - 1), MAX_RECHECK_DAYS)
+
+
+class NegativeCache:
+    """Persistent set of units to skip until their next re-check, saved after every change."""
+
+    def __init__(self, file_path, entries=None, now=None):
+        self.file_path = file_path
+        self.entries = entries if entries is not None else {}
+        self.now = now or datetime.now()
+        self.skipped = []
+
+    @classmethod
+    def load(cls, file_path, now=None):
+        entries = {}
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except ValueError:
+                print(f"Warning: negative cache {file_path} is corrupt, ignoring it")
+        return cls(file_path, entries, now)
+
+    def save(self):
+        tmp_file = self.file_path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.file_path)
+
+    def is_due(self, file_name):
+        entry = self.entries.get(file_name)
+        if entry is None or entry.get('reason') != REASON_EMPTY:
+            return True
+        try:
+            next_check = parse_timestamp(entry['nextCheckAt'])
+        except (KeyError, ValueError):
+            return True
+        return self.now >= next_check - timedelta(hours=RECHECK_SLACK_HOURS)
+
+    def should_scrape(self, file_name):
+        """Decide whether to request a unit now, recording it as skipped if not."""
+        if self.is_due(file_name):
+            return True
+        self.skipped.append(file_name)
+        return False
+
+    def record_miss(self, file_name, reason=REASON_EMPTY):
+        """Record a result without terms and schedule the next check."""
+        now = datetime.now()
+        entry = self.entries.get(file_name, {})
+        misses = entry.get('misses', 0) + 1
+        self.entries[file_name] = {
+            'reason': reason,
+            'misses': misses,
+            'firstMissAt': entry.get('firstMissAt', now.strftime(TIMESTAMP_FORMAT)),
+            'checkedAt': now.strftime(TIMESTAMP_FORMAT),
+            'nextCheckAt': (now + timedelta(days=get_recheck_interval(misses))).strftime(TIMESTAMP_FORMAT),
+        }
+        self.save()
+
+    def record_hit(self, file_name):
+        """Forget a unit that returned terms again."""
+        if self.entries.pop(file_name, None) is not None:
+            print(f"    {file_name} returned terms again, removed from the negative cache")
+            self.save()
+
+    def print_summary(self):
+        due = sum(1 for file_name in self.entries if self.is_due(file_name))
+        print(f"  Negative cache: {len(self.entries)} units ({due} due for a re-check), "
+              f"{len(self.skipped)} skipped in this run")
+        for file_name in sorted(self.skipped):
+            entry = self.entries[file_name]
+            print(f"    - {file_name}: {entry['reason']} x{entry['misses']}, next check {entry['nextCheckAt']}")
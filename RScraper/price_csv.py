@@ -0,0 +1,276 @@
+"""
+Shared reader for the price CSV files in data/ — used by processor.py and generate_deals.py.
+
+File layout: the header row holds scrape timestamps, every other row holds a term
+'dd.mm.yyyy - dd.mm.yyyy' followed by one price cell per timestamp. processor.py writes
+timestamps in ascending order, so the newest prices are the last cells of each row and
+can be read without reordering the history.
+
+Header versions:
+- v1: first cell empty, timestamps 'dd.mm.yyyy HH:MM:SS',
+- v2: first cell 'v2', ISO-8601 timestamps 'yyyy-mm-ddTHH:MM:SS', which sort as strings.
+Readers accept both and always return ISO-8601 timestamps. Writers keep the version of
+the file they rewrite (new files follow the other files of their directory), so files
+only switch to v2 when migrate_csv_header.py is run, together with the RDisplay release
+that reads v2.
+
+Files are streamed line by line; files larger than MMAP_THRESHOLD are memory-mapped.
+Both paths return the same lines; below the threshold (all current data files) buffered
+reading is as fast and needs no mapping.
+"""
+import os
+import re
+import mmap
+from datetime import datetime
+
+HEADER_VERSION = "v2"
+LEGACY_HEADER_VERSION = ""  # v1: empty first header cell
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+LEGACY_TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}')
+LEGACY_TIMESTAMP_PATTERN = re.compile(r'(\d{2})\.(\d{2})\.(\d{4}) (\d{2}:\d{2}:\d{2})')
+MMAP_THRESHOLD = 1024 * 1024  # bytes
+
+
+def parse_timestamp(timestamp):
+    """Parse a timestamp in either header format."""
+    timestamp = timestamp.strip()
+    if TIMESTAMP_PATTERN.fullmatch(timestamp):
+        return datetime.fromisoformat(timestamp)
+    return datetime.strptime(timestamp, LEGACY_TIMESTAMP_FORMAT)
+
+
+def timestamp_sort_key(timestamp):
+    """Sort key for timestamps in either format; unparsable values sort as the oldest.
+
+    ISO-8601 timestamps are their own key. Legacy 'dd.mm.yyyy HH:MM:SS' values are
+    rearranged into the same form instead of calling strptime.
+    """
+    timestamp = timestamp.strip()
+    if TIMESTAMP_PATTERN.fullmatch(timestamp):
+        return timestamp
+    m = LEGACY_TIMESTAMP_PATTERN.fullmatch(timestamp)
+    if not m:
+        return ''
+    day, month, year, time_part = m.groups()
+    return f"{year}-{month}-{day}T{time_part}"
+
+
+def normalize_timestamp(timestamp):
+    """Return a timestamp in the current (ISO-8601) format, unparsable values unchanged."""
+    return timestamp_sort_key(timestamp) or timestamp
+
+
+def format_header_timestamp(timestamp, header_version):
+    """Format a timestamp for a header of the given version, unparsable values unchanged."""
+    key = timestamp_sort_key(timestamp)
+    if not key:
+        return timestamp
+    if header_version == HEADER_VERSION:
+        return key
+    date_part, time_part = key.split('T')
+    year, month, day = date_part.split('-')
+    return f"{day}.{month}.{year} {time_part}"
+
+
+def read_header_version(file_path):
+    """Return the header version of a CSV file, or None if it does not exist or is empty."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return None
+    if not header.strip():
+        return None
+    return HEADER_VERSION if header.split(',', 1)[0].strip() == HEADER_VERSION else LEGACY_HEADER_VERSION
+
+
+def get_directory_header_version(data_dir):
+    """Header version for new files: that of the first CSV file in the directory, else v1."""
+    try:
+        names = sorted(name for name in os.listdir(data_dir) if name.endswith('.csv'))
+    except FileNotFoundError:
+        return LEGACY_HEADER_VERSION
+    for name in names:
+        version = read_header_version(os.path.join(data_dir, name))
+        if version is not None:
+            return version
+    return LEGACY_HEADER_VERSION
+
+
+def parse_price(cell):
+    """Convert a price cell to int, or None if it is empty or invalid."""
+    cell = cell.strip()
+    return int(cell) if cell and cell.isdigit() else None
+
+
+def iter_lines(file_path):
+    """Yield the lines of a file without line endings, memory-mapping large files."""
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return
+
+    if size < MMAP_THRESHOLD:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+        return
+
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                yield line.decode('utf-8').rstrip('\r\n')
+
+
+def read_price_table(file_path):
+    """Stream a price CSV file.
+
+    Returns (timestamps, rows) where timestamps are in file order (ISO-8601, whatever
+    the header version) and rows is a generator of (term, cells) with the raw price
+    cells, or (None, None) if the file has no valid header. Rows without any price
+    cell are skipped.
+    """
+    lines = iter_lines(file_path)
+    timestamps = read_header_timestamps(lines)
+    if timestamps is None:
+        return None, None
+
+    def rows():
+        for line in lines:
+            parts = line.strip().split(',')
+            if len(parts) < 2:
+                continue
+            yield parts[0], parts[1:]
+
+    return timestamps, rows()
+
+
+def read_header_timestamps(lines):
+    """Consume the header line of a line iterator and return its ISO-8601 timestamps, or None."""
+    header = next(lines, None)
+    if header is None:
+        return None
+
+    headers = header.strip().split(',')
+    if len(headers) <= 1:
+        return None
+
+    timestamps = headers[1:]
+    if headers[0] != HEADER_VERSION:
+        timestamps = [normalize_timestamp(ts) for ts in timestamps]
+    return timestamps
+
+
+def is_sorted_ascending(timestamps):
+    """Check the column order of timestamps returned by read_price_table (plain string order)."""
+    return all(older <= newer for older, newer in zip(timestamps, timestamps[1:]))
+
+
+def read_prices_newest_first(file_path):
+    """Read the full history of every term with prices ordered from newest to oldest.
+
+    Returns {'timestamps': [...], 'terms': [{'dateRange': str, 'prices': [int | None, ...]}]}
+    or None if the file has no data rows.
+    """
+    timestamps, rows = read_price_table(file_path)
+    if timestamps is None:
+        return None
+
+    order = sorted(range(len(timestamps)), key=lambda i: timestamp_sort_key(timestamps[i]), reverse=True)
+
+    terms = []
+    for term, cells in rows:
+        prices = [parse_price(cells[i]) if i < len(cells) else None for i in order]
+        terms.append({'dateRange': term, 'prices': prices})
+
+    if not terms:
+        return None
+
+    return {
+        'timestamps': [timestamps[i] for i in order],
+        'terms': terms,
+    }
+
+
+def read_price_summary(file_path, tail=2):
+    """Read the newest `tail` prices and the min/max valid price of every term.
+
+    Fast path for files with ascending timestamps (as written by processor.py): the
+    tail cells are cut off the end of each line with a bounded rsplit, and only the
+    older part of the line is split, to scan it for min/max without reordering or
+    keeping it. Other files fall back to a full parse. generate_deals.py reads the
+    summary from the price-matrix cache (price_matrix.py), which needs no text parsing.
+
+    Returns {'timestamps': [newest, ...], 'terms': [{'dateRange', 'prices', 'min', 'max'}]}
+    where 'prices' holds `tail` entries newest first (None when missing), or None if the
+    file has no data rows.
+    """
+    lines = iter_lines(file_path)
+    timestamps = read_header_timestamps(lines)
+    if timestamps is None:
+        return None
+
+    if not is_sorted_ascending(timestamps):
+        return summarize_full_history(read_prices_newest_first(file_path), tail)
+
+    tail_count = min(tail, len(timestamps))
+    terms = []
+    for line in lines:
+        line = line.strip()
+        commas = line.count(',')
+        if commas < 1:
+            continue
+
+        if commas == len(timestamps):
+            head, *tail_cells = line.rsplit(',', tail_count)
+            term, _, history = head.partition(',')
+            cells = history.split(',') if history else []
+        else:
+            # Ragged row, align cells by position like the full parser does
+            term, *cells = line.split(',')
+            cells = (cells + [''] * len(timestamps))[:len(timestamps)]
+            tail_cells = cells[len(cells) - tail_count:]
+            cells = cells[:len(cells) - tail_count]
+
+        tail_prices = [parse_price(cell) for cell in reversed(tail_cells)]
+        # Cells written by processor.py are bare digits, so isdigit() is enough here
+        prices = list(map(int, filter(str.isdigit, cells)))
+        prices.extend(p for p in tail_prices if p is not None)
+        highest = max(prices, default=0)
+
+        terms.append({
+            'dateRange': term,
+            'prices': tail_prices + [None] * (tail - tail_count),
+            'min': min(filter((0).__lt__, prices), default=None),
+            'max': highest if highest > 0 else None,
+        })
+
+    if not terms:
+        return None
+
+    return {
+        'timestamps': list(reversed(timestamps[len(timestamps) - tail_count:])),
+        'terms': terms,
+    }
+
+
+def summarize_full_history(parsed, tail):
+    """Reduce a newest-first full history to the shape returned by read_price_summary."""
+    if not parsed:
+        return None
+
+    terms = []
+    for term in parsed['terms']:
+        valid = [p for p in term['prices'] if p is not None and p > 0]
+        prices = term['prices'][:tail]
+        terms.append({
+            'dateRange': term['dateRange'],
+            'prices': prices + [None] * (tail - len(prices)),
+            'min': min(valid) if valid else None,
+            'max': max(valid) if valid else None,
+        })
+
+    return {
+        'timestamps': parsed['timestamps'][:tail],
+        'terms': terms,
+    }
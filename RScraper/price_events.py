@@ -0,0 +1,134 @@
+"""
+Price-change event log — written by processor.py while merging a scrape into a CSV file.
+
+Every scrape merged into a file appends one JSON line per term whose price changed,
+that appeared or that disappeared compared to the previous newest scrape of the file:
+
+    {"timestamp": "...", "file": "x.csv", "term": "dd.mm.yyyy - dd.mm.yyyy",
+     "type": "changed" | "appeared" | "disappeared", "oldPrice": int | null, "newPrice": int | null}
+
+Terms with an unchanged price produce no event; every merged scrape also appends one
+{"type": "scraped", "changes": n} marker so that "no events" can be told apart from
+"not scraped". Scrapes returning exactly the newest column are not merged and log
+nothing; they are recorded in the scrape state (scrape_state.py) instead. Downstream steps (generate_deals.py) use the events of a file's newest
+scrape instead of rediscovering the changes.
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from price_csv import parse_timestamp, timestamp_sort_key
+
+EVENTS_FILE_NAME = "price-events.jsonl"
+EVENT_RETENTION_DAYS = 30
+
+
+def get_events_file(data_dir):
+    return os.path.join(data_dir, EVENTS_FILE_NAME)
+
+
+def diff_prices(existing_prices, new_prices, file_name):
+    """Compare a new scrape with the newest scrape already stored for the file.
+
+    existing_prices / new_prices are {term: {timestamp: price}} as built by processor.py;
+    new_prices holds a single timestamp. Returns the list of change events.
+    """
+    new_timestamps = {ts for prices in new_prices.values() for ts in prices}
+    if len(new_timestamps) != 1:
+        return []
+    timestamp = new_timestamps.pop()
+
+    existing_timestamps = {ts for prices in existing_prices.values() for ts in prices}
+    previous_timestamp = max(existing_timestamps, key=timestamp_sort_key, default=None)
+
+    events = []
+    for term in sorted(set(existing_prices) | set(new_prices)):
+        old_price = existing_prices.get(term, {}).get(previous_timestamp) if previous_timestamp else None
+        new_price = new_prices.get(term, {}).get(timestamp)
+
+        if old_price is None and new_price is None:
+            continue
+        if old_price is None:
+            event_type = 'appeared'
+        elif new_price is None:
+            event_type = 'disappeared'
+        elif old_price != new_price:
+            event_type = 'changed'
+        else:
+            continue
+
+        events.append({
+            'timestamp': timestamp,
+            'file': file_name,
+            'term': term,
+            'type': event_type,
+            'oldPrice': old_price,
+            'newPrice': new_price,
+        })
+
+    events.append({'timestamp': timestamp, 'file': file_name, 'type': 'scraped', 'changes': len(events)})
+    return events
+
+
+def append_events(events_file, events):
+    if not events:
+        return
+    with open(events_file, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+def iter_events(events_file):
+    """Yield the events of the log, skipping malformed lines (e.g. an interrupted write)."""
+    if not os.path.exists(events_file):
+        return
+    with open(events_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def load_latest_events(events_file):
+    """Return the events of the newest scrape of every file.
+
+    Result: {file name: {'timestamp': str, 'terms': {term: event}}}. A file only has an
+    entry once a scrape of it was merged with event logging in place.
+    """
+    latest = {}
+    for event in iter_events(events_file):
+        entry = latest.get(event['file'])
+        if entry is None or timestamp_sort_key(event['timestamp']) > timestamp_sort_key(entry['timestamp']):
+            entry = {'timestamp': event['timestamp'], 'terms': {}}
+            latest[event['file']] = entry
+        if event['timestamp'] == entry['timestamp'] and event['type'] != 'scraped':
+            entry['terms'][event['term']] = event
+    return latest
+
+
+def prune_events(events_file, retention_days=EVENT_RETENTION_DAYS, now=None):
+    """Drop events older than retention_days so the log does not grow without bound."""
+    if not os.path.exists(events_file):
+        return 0
+
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    kept = []
+    dropped = 0
+    for event in iter_events(events_file):
+        try:
+            is_recent = parse_timestamp(event['timestamp']) >= cutoff
+        except (KeyError, ValueError):
+            is_recent = False
+        if is_recent:
+            kept.append(event)
+        else:
+            dropped += 1
+
+    if dropped:
+        tmp_file = events_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for event in kept:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        os.replace(tmp_file, events_file)
+
+    return dropped
@@ -0,0 +1,165 @@
+"""
+Binary price-matrix cache of the price CSV files — lets deal generation load a file's
+prices without parsing its text.
+
+Per CSV file, .cache/price-matrix/ holds:
+- <stem>.<dir hash>.bin — int32 matrix of terms x timestamps in native byte order,
+  row-major, timestamps ascending, MISSING for empty cells,
+- <stem>.<dir hash>.json — index: terms (row order), timestamps (column order) and the
+  size and modification time of the CSV file the matrix was built from.
+
+processor.py writes the cache after every CSV write. Readers memory-map the matrix and
+work on zero-copy int32 rows; a cache whose CSV file changed since (e.g. after a git
+pull) is rebuilt from the CSV on the next read.
+"""
+import os
+import sys
+import json
+import mmap
+import hashlib
+from array import array
+from price_csv import read_price_table, parse_price, timestamp_sort_key
+from price_csv import read_price_summary as read_text_summary
+
+MATRIX_VERSION = 1
+MISSING = -1
+TYPECODE = 'i'  # int32 on all supported platforms, checked when loading
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "price-matrix")
+
+
+def get_cache_paths(csv_path, cache_dir=CACHE_DIR):
+    """Return (matrix path, index path); the data directory is hashed in so copies do not collide."""
+    csv_path = os.path.abspath(csv_path)
+    dir_hash = hashlib.sha1(os.path.dirname(csv_path).encode('utf-8')).hexdigest()[:8]
+    stem = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(csv_path))[0]}.{dir_hash}")
+    return stem + '.bin', stem + '.json'
+
+
+def get_csv_signature(csv_path):
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_price_matrix(csv_path, terms, timestamps, rows, cache_dir=CACHE_DIR):
+    """Write the cache of a CSV file from its terms, ascending timestamps and price rows.
+
+    rows yields one sequence of int-or-None prices per term, aligned with timestamps.
+    Failures are reported but not raised, the cache is an optimization only.
+    """
+    matrix_path, index_path = get_cache_paths(csv_path, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Without an index the matrix is never read, so a crash below leaves no stale pair
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        values = array(TYPECODE)
+        for row in rows:
+            values.extend(MISSING if price is None else price for price in row)
+        with open(matrix_path + '.tmp', 'wb') as f:
+            values.tofile(f)
+        os.replace(matrix_path + '.tmp', matrix_path)
+
+        index = {
+            'version': MATRIX_VERSION,
+            'byteorder': sys.byteorder,
+            'csv': get_csv_signature(csv_path),
+            'terms': list(terms),
+            'timestamps': list(timestamps),
+        }
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(index_path + '.tmp', index_path)
+    except (OSError, OverflowError) as e:
+        print(f"Warning: could not write the price matrix of {csv_path}: {e}")
+
+
+def write_price_matrix_from_prices(csv_path, prices, sorted_terms, sorted_timestamps, cache_dir=CACHE_DIR):
+    """Write the cache from the {term: {timestamp: price}} dict just saved by processor.py."""
+    rows = ([prices[term].get(ts) for ts in sorted_timestamps] for term in sorted_terms)
+    write_price_matrix(csv_path, sorted_terms, sorted_timestamps, rows, cache_dir)
+
+
+def build_price_matrix(csv_path, cache_dir=CACHE_DIR):
+    """Parse a CSV file and write its cache; returns False if the file has no valid header."""
+    timestamps, rows = read_price_table(csv_path)
+    if timestamps is None:
+        return False
+
+    order = sorted(range(len(timestamps)), key=lambda i: timestamp_sort_key(timestamps[i]))
+    terms = []
+    matrix_rows = []
+    for term, cells in rows:
+        terms.append(term)
+        matrix_rows.append([parse_price(cells[i]) if i < len(cells) else None for i in order])
+
+    write_price_matrix(csv_path, terms, [timestamps[i] for i in order], matrix_rows, cache_dir)
+    return True
+
+
+def load_index(csv_path, cache_dir=CACHE_DIR):
+    """Return the cache index of a CSV file if it is current, else None."""
+    matrix_path, index_path = get_cache_paths(csv_path, cache_dir)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get('version') != MATRIX_VERSION or index.get('byteorder') != sys.byteorder
+                or index.get('csv') != get_csv_signature(csv_path)):
+            return None
+        expected_size = len(index['terms']) * len(index['timestamps']) * array(TYPECODE).itemsize
+        if array(TYPECODE).itemsize != 4 or os.path.getsize(matrix_path) != expected_size:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return index
+
+
+def summarize_matrix(matrix_path, index, tail):
+    """Compute the read_price_summary result from a memory-mapped matrix."""
+    terms = index['terms']
+    width = len(index['timestamps'])
+    if not terms:
+        return None
+
+    tail_count = min(tail, width)
+    summary_terms = []
+    with open(matrix_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm).cast(TYPECODE)
+            try:
+                for row_index, term in enumerate(terms):
+                    row = view[row_index * width:(row_index + 1) * width]
+                    tail_prices = [None if p == MISSING else p for p in reversed(row[width - tail_count:])]
+                    highest = max(row)
+                    lowest = min(filter((0).__lt__, row), default=None)
+                    summary_terms.append({
+                        'dateRange': term,
+                        'prices': tail_prices + [None] * (tail - tail_count),
+                        'min': lowest,
+                        'max': highest if highest > 0 else None,
+                    })
+                    row.release()
+            finally:
+                view.release()
+
+    return {
+        'timestamps': index['timestamps'][::-1][:tail_count],
+        'terms': summary_terms,
+    }
+
+
+def read_price_summary(csv_path, tail=2, cache_dir=CACHE_DIR):
+    """price_csv.read_price_summary served from the price-matrix cache, rebuilding it if stale."""
+    index = load_index(csv_path, cache_dir)
+    if index is None:
+        if not build_price_matrix(csv_path, cache_dir):
+            return None
+        index = load_index(csv_path, cache_dir)
+        if index is None:
+            # The cache could not be written (e.g. read-only checkout), parse the text
+            return read_text_summary(csv_path, tail)
+
+    if not index['terms'] or not index['timestamps']:
+        return None
+    matrix_path, _ = get_cache_paths(csv_path, cache_dir)
+    return summarize_matrix(matrix_path, index, tail)
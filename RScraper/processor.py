@@ -1,10 +1,19 @@
 import os
 import csv
 from datetime import datetime
+from price_csv import (
+    TIMESTAMP_FORMAT, normalize_timestamp, read_price_table, timestamp_sort_key,
+    format_header_timestamp, read_header_version, get_directory_header_version,
+)
+from price_events import diff_prices, append_events, get_events_file
+from price_matrix import write_price_matrix_from_prices
+from scrape_state import (
+    get_state_file, hash_results, load_scrape_state, save_scrape_state, is_known_unchanged, count_scrape,
+)
 
 def get_current_timestamp():
     current_time = datetime.now()
-    timestamp = current_time.strftime("%d.%m.%Y %H:%M:%S")
+    timestamp = current_time.strftime(TIMESTAMP_FORMAT)
     print(f"Current timestamp: {timestamp}")
     return timestamp
 
@@ -15,39 +24,28 @@ def load_existing_prices(file_path):
         print(f"File {file_path} does not exist. Returning an empty dictionary.")
         return existing_prices
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-        if len(lines) == 0:
-            print(f"File {file_path} is empty. Returning an empty dictionary.")
-            return existing_prices
-
-        headers = lines[0].strip().split(',')
-        if len(headers) <= 1:
-            print(f"Headers in {file_path} are invalid. Returning an empty dictionary.")
-            return existing_prices
-
-        headers = headers[1:]
-        for line in lines[1:]:
-            parts = line.strip().split(',')
-            if len(parts) < 2:
-                continue
+    headers, rows = read_price_table(file_path)
+    if headers is None:
+        print(f"File {file_path} is empty or its headers are invalid. Returning an empty dictionary.")
+        return existing_prices
 
-            term = parts[0]
-            existing_prices[term] = {}
+    for term, cells in rows:
+        existing_prices[term] = {}
 
-            for i, price in enumerate(parts[1:]):
-                if i >= len(headers):
-                    continue
+        for i, price in enumerate(cells):
+            if i >= len(headers):
+                continue
 
-                timestamp = headers[i]
-                existing_prices[term][timestamp] = int(price) if price else None
+            timestamp = headers[i]
+            existing_prices[term][timestamp] = int(price) if price else None
 
     return existing_prices
 
-def build_new_prices(results):
+def build_new_prices(results, timestamp=None):
     print("Building new prices...")
     new_prices = {}
-    current_timestamp = get_current_timestamp()
+    # Timestamps of older archive entries may still be in the legacy format
+    current_timestamp = normalize_timestamp(timestamp) if timestamp else get_current_timestamp()
 
     for term, price in results:
         if term not in new_prices:
@@ -77,15 +75,20 @@ def parse_date_from_term(term):
 
 def save_prices_to_csv(prices, file_path):
     print(f"Saving merged prices to CSV file: {file_path}")
+    # Keep the header version of the file; only migrate_csv_header.py switches it
+    header_version = read_header_version(file_path)
+    if header_version is None:
+        header_version = get_directory_header_version(os.path.dirname(file_path) or '.')
+
     with open(file_path, 'w', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
         timestamps = set()
         for term, timestamps_prices in prices.items():
             timestamps.update(timestamps_prices.keys())
 
-        print(f"Sorting the timestamps as datetime objects")
-        sorted_timestamps = sorted(timestamps, key=lambda timestamp: datetime.strptime(timestamp, "%d.%m.%Y %H:%M:%S"))
-        writer.writerow([''] + sorted_timestamps)
+        print(f"Sorting the timestamps")
+        sorted_timestamps = sorted(timestamps, key=timestamp_sort_key)
+        writer.writerow([header_version] + [format_header_timestamp(ts, header_version) for ts in sorted_timestamps])
 
         print(f"Sorting the dates in ascending order by the start date")
         sorted_terms = sorted(prices.keys(), key=parse_date_from_term)
@@ -99,8 +102,79 @@ def save_prices_to_csv(prices, file_path):
             writer.writerow(row)
     print(f"Merged data saved to: '{file_path}'")
 
-def process_data(results, file_path):
+    # Binary copy for readers that only need the prices, see price_matrix.py
+    write_price_matrix_from_prices(file_path, prices, sorted_terms, sorted_timestamps)
+
+def get_newest_prices(existing_prices):
+    """Return the newest timestamp and the prices stored under it, or (None, {})."""
+    timestamps = {ts for timestamps_prices in existing_prices.values() for ts in timestamps_prices}
+    if not timestamps:
+        return None, {}
+
+    newest = max(timestamps, key=timestamp_sort_key)
+    return newest, {
+        term: timestamps_prices[newest] for term, timestamps_prices in existing_prices.items()
+        if timestamps_prices.get(newest) is not None
+    }
+
+def mark_seen_unchanged(state, file_name, file_path, results_hash, written_at, timestamp=None):
+    timestamp = timestamp or get_current_timestamp()
+    print(f"Prices unchanged since {written_at}, recording the scrape at {timestamp} without rewriting {file_path}")
+    state[file_name] = {
+        'hash': results_hash,
+        'size': os.path.getsize(file_path),
+        'writtenAt': written_at,
+        'seenAt': timestamp,
+        'scrapes': count_scrape(state.get(file_name), written_at, written=False),
+    }
+
+def process_data(results, file_path, events_file=None, state_file=None, timestamp=None):
+    """Merge scraped results into the CSV file, as a column for `timestamp` (default: now).
+
+    Returns True if the file was written, False if the results equal its newest column
+    and only the "seen at" marker in the scrape state was updated, or if there were no
+    results, which leave the file and its scrape state untouched.
+    """
+    if not results:
+        print(f"No terms scraped, leaving {file_path} unchanged")
+        return False
+
+    file_name = os.path.basename(file_path)
+    state_file = state_file or get_state_file(os.path.dirname(file_path))
+    state = load_scrape_state(state_file)
+    entry = state.get(file_name)
+    results_hash = hash_results(results)
+
+    if is_known_unchanged(entry, results_hash, file_path):
+        mark_seen_unchanged(state, file_name, file_path, results_hash, entry['writtenAt'], timestamp)
+        save_scrape_state(state_file, state)
+        return False
+
     existing_prices = load_existing_prices(file_path)
-    new_prices = build_new_prices(results)
+    newest, newest_prices = get_newest_prices(existing_prices)
+    if results and newest_prices == {term: int(price) for term, price in results}:
+        mark_seen_unchanged(state, file_name, file_path, results_hash, newest, timestamp)
+        save_scrape_state(state_file, state)
+        return False
+
+    new_prices = build_new_prices(results, timestamp)
+
+    # Diff before merging, merge_prices updates existing_prices in place
+    events = diff_prices(existing_prices, new_prices, os.path.basename(file_path))
+
     merged_prices = merge_prices(existing_prices, new_prices)
-    save_prices_to_csv(merged_prices, file_path)
\ No newline at end of file
+    save_prices_to_csv(merged_prices, file_path)
+
+    append_events(events_file or get_events_file(os.path.dirname(file_path)), events)
+    print(f"Recorded {max(len(events) - 1, 0)} price change events")
+
+    written_at = max((ts for prices in new_prices.values() for ts in prices), key=timestamp_sort_key)
+    state[file_name] = {
+        'hash': results_hash,
+        'size': os.path.getsize(file_path),
+        'writtenAt': written_at,
+        'seenAt': None,
+        'scrapes': count_scrape(entry, written_at, written=True),
+    }
+    save_scrape_state(state_file, state)
+    return True
\ No newline at end of file
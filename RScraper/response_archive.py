@@ -0,0 +1,137 @@
+"""
+Raw response archive for RScraper — keeps every kalkulator API response so that CSV files
+can be rebuilt, or new fields extracted, without scraping again.
+
+Layout of the archive directory:
+- objects/ab/<sha256>.json.gz — gzip-compressed responses, named by the SHA-256 of their
+  canonical JSON, so a response identical to an earlier one is stored only once,
+- index.jsonl — one line per archived scrape: timestamp, CSV file (unit key), trip,
+  departure, person count and the object id.
+
+Reprocessing (no network access):
+    python response_archive.py [--archive-dir ../archive] [--output-dir DIR] [--file TEXT] [--merge]
+"""
+import os
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+from processor import build_new_prices, merge_prices, load_existing_prices, save_prices_to_csv, get_newest_prices
+from price_csv import timestamp_sort_key
+
+INDEX_FILE_NAME = "index.jsonl"
+OBJECTS_DIR_NAME = "objects"
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+
+
+class ResponseArchive:
+    """Content-addressed store of raw kalkulator responses with a scrape index."""
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.index_file = os.path.join(archive_dir, INDEX_FILE_NAME)
+        self.objects_dir = os.path.join(archive_dir, OBJECTS_DIR_NAME)
+
+    def object_path(self, object_id):
+        return os.path.join(self.objects_dir, object_id[:2], f"{object_id}.json.gz")
+
+    def add(self, unit_key, details, departure, timestamp, response):
+        """Store a response (once per distinct content) and index it; returns the object id."""
+        content = json.dumps(response, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        object_id = hashlib.sha256(content).hexdigest()
+
+        object_path = self.object_path(object_id)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = object_path + '.tmp'
+            # mtime=0 keeps the compressed bytes reproducible for identical content
+            with gzip.GzipFile(tmp_path, 'wb', mtime=0) as f:
+                f.write(content)
+            os.replace(tmp_path, object_path)
+
+        entry = {
+            'timestamp': timestamp,
+            'file': unit_key,
+            'trip': details['trip_name'],
+            'departure': departure['Nazwa'],
+            'persons': details['person_count'],
+            'object': object_id,
+        }
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(self.index_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return object_id
+
+    def load(self, object_id):
+        with gzip.open(self.object_path(object_id), 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def iter_index(self):
+        """Yield the index entries, skipping malformed lines (e.g. an interrupted write)."""
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def reprocess(archive, output_dir, file_filter=None, merge=False):
+    """Rebuild CSV files from the archived responses.
+
+    Every file is built in memory from its index entries in timestamp order and written
+    once. Like process_data, a scrape equal to the newest column adds no column. With
+    merge=True the existing CSV files in output_dir are the starting point.
+    """
+    from scraper import extract_dates_and_prices
+
+    entries_by_file = {}
+    for entry in archive.iter_index():
+        if file_filter and file_filter not in entry['file']:
+            continue
+        entries_by_file.setdefault(entry['file'], []).append(entry)
+
+    os.makedirs(output_dir, exist_ok=True)
+    results_by_object = {}  # identical responses are parsed once
+
+    for unit_key, entries in sorted(entries_by_file.items()):
+        file_path = os.path.join(output_dir, f"{unit_key}.csv")
+        prices = load_existing_prices(file_path) if merge else {}
+
+        for entry in sorted(entries, key=lambda e: timestamp_sort_key(e['timestamp'])):
+            object_id = entry['object']
+            if object_id not in results_by_object:
+                results_by_object[object_id] = extract_dates_and_prices(archive.load(object_id))
+            results = results_by_object[object_id]
+
+            _, newest_prices = get_newest_prices(prices)
+            if results and newest_prices == {term: int(price) for term, price in results}:
+                continue
+            merge_prices(prices, build_new_prices(results, entry['timestamp']))
+
+        save_prices_to_csv(prices, file_path)
+
+    print(f"✓ Rebuilt {len(entries_by_file)} CSV files from {len(results_by_object)} archived responses into: {output_dir}")
+    return len(entries_by_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild CSV files from the raw response archive without scraping.")
+    parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="archive directory (default: ../archive)")
+    parser.add_argument(
+        "--output-dir",
+        help="directory for the rebuilt CSV files (default: <archive-dir>/rebuilt)",
+    )
+    parser.add_argument("--file", help="only rebuild files whose name contains this text")
+    parser.add_argument("--merge", action="store_true", help="merge into the existing CSV files of the output directory")
+    args = parser.parse_args()
+
+    archive = ResponseArchive(args.archive_dir)
+    if not os.path.exists(archive.index_file):
+        print(f"Error: no archive index found at {archive.index_file}")
+        sys.exit(1)
+
+    reprocess(archive, args.output_dir or os.path.join(args.archive_dir, "rebuilt"), args.file, args.merge)
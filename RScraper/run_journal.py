@@ -0,0 +1,147 @@
+"""
+Run journal for RScraper — records every completed (trip, person count, departure) unit
+so that an interrupted run can be resumed without repeating finished work.
+"""
+import os
+import json
+from datetime import datetime
+from price_csv import TIMESTAMP_FORMAT
+
+JOURNAL_FILE_NAME = "run-journal.json"
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETE = "complete"
+
+UNIT_DONE = "done"
+UNIT_FAILED = "failed"
+
+
+def _now():
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+class RunJournal:
+    """Persistent record of a single scrape run, saved after every change.
+
+    Units are keyed by the generated CSV file name, which is unique per
+    (trip, departure, person count). Departure lists discovered for each trip
+    combination are stored as well, so a resumed run can skip whole trips
+    without fetching their pages again.
+    """
+
+    def __init__(self, file_path, state):
+        self.file_path = file_path
+        self.state = state
+
+    @classmethod
+    def start(cls, file_path, resume=False):
+        """Open the journal for a new run.
+
+        When resuming, a journal that is still running or has failed units is continued
+        instead, so only the missing or failed units are scraped again.
+        """
+        state = None
+        if resume and os.path.exists(file_path):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except ValueError:
+                print(f"Warning: run journal {file_path} is corrupt, starting a new run")
+
+        if state is not None:
+            journal = cls(file_path, state)
+            if state.get("status") == STATUS_RUNNING or journal.failed_units():
+                done = journal.summary()[UNIT_DONE]
+                print(f"Resuming run started at {state['started_at']} ({done} units already done)")
+                state["status"] = STATUS_RUNNING
+                state["finished_at"] = None
+                journal.save()
+                return journal
+            print("Previous run has completed without failures, starting a new run")
+
+        state = {
+            "started_at": _now(),
+            "finished_at": None,
+            "status": STATUS_RUNNING,
+            "trips": {},
+            "units": {},
+        }
+        journal = cls(file_path, state)
+        journal.save()
+        return journal
+
+    def save(self):
+        """Write the journal atomically so a crash never leaves it half-written."""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.file_path)
+
+    # --- Trips ---
+
+    def get_departures(self, trip_key):
+        """Return the departure names recorded for a trip combination, or None if unknown."""
+        trip = self.state["trips"].get(trip_key)
+        return trip.get("departures") if trip else None
+
+    def record_departures(self, trip_key, departure_names):
+        self.state["trips"][trip_key] = {"departures": list(departure_names), "at": _now()}
+        self.save()
+
+    def record_trip_failed(self, trip_key, error):
+        trip = self.state["trips"].setdefault(trip_key, {})
+        trip["error"] = str(error)
+        trip["at"] = _now()
+        self.save()
+
+    # --- Units ---
+
+    def is_done(self, unit_key):
+        unit = self.state["units"].get(unit_key)
+        return unit is not None and unit["status"] == UNIT_DONE
+
+    def mark_done(self, unit_key, file_path, term_count, changed=True):
+        self.state["units"][unit_key] = {
+            "status": UNIT_DONE,
+            "file": os.path.basename(file_path),
+            "terms": term_count,
+            "changed": changed,
+            "at": _now(),
+        }
+        self.save()
+
+    def mark_failed(self, unit_key, error):
+        unit = self.state["units"].get(unit_key, {})
+        self.state["units"][unit_key] = {
+            "status": UNIT_FAILED,
+            "error": str(error),
+            "attempts": unit.get("attempts", 0) + 1,
+            "at": _now(),
+        }
+        self.save()
+
+    def is_failed(self, unit_key):
+        unit = self.state["units"].get(unit_key)
+        return unit is not None and unit["status"] == UNIT_FAILED
+
+    def finish(self):
+        self.state["status"] = STATUS_COMPLETE
+        self.state["finished_at"] = _now()
+        self.save()
+
+    def summary(self):
+        """Return counts of done and failed units."""
+        counts = {UNIT_DONE: 0, UNIT_FAILED: 0}
+        for unit in self.state["units"].values():
+            counts[unit["status"]] = counts.get(unit["status"], 0) + 1
+        return counts
+
+    def changed_count(self):
+        """Number of done units whose file was written (units from older journals count as changed)."""
+        return sum(
+            1 for u in self.state["units"].values()
+            if u["status"] == UNIT_DONE and u.get("changed", True)
+        )
+
+    def failed_units(self):
+        return sorted(k for k, u in self.state["units"].items() if u["status"] == UNIT_FAILED)
@@ -0,0 +1,176 @@
+"""
+Scrape scheduler for RScraper — decides which (trip, departure) files are due for a refresh.
+
+Each CSV file gets a refresh interval derived from its stored history:
+- files with a term departing within NEAR_DEPARTURE_WINDOW_DAYS are refreshed every run,
+- otherwise the interval shrinks from MAX_REFRESH_INTERVAL_DAYS towards MIN_REFRESH_INTERVAL_DAYS
+  as the share of recent scrapes that changed a price grows. Scrapes that found unchanged
+  prices add no column, so the scrape counts of the scrape state fill them in.
+
+Due files are ranked by how overdue they are and the top ones are scraped within the
+per-run request budget; the rest stay due and rank higher in the next run.
+"""
+import os
+from datetime import datetime
+from processor import load_existing_prices, parse_date_from_term
+from price_csv import parse_timestamp, timestamp_sort_key
+from scrape_state import get_state_file, load_scrape_state, get_seen_markers, get_scrape_counts, is_seen_after
+
+NEAR_DEPARTURE_WINDOW_DAYS = 30     # Mirrors LAST_MINUTE_MAX_WINDOW_DAYS in generate_deals.py
+MIN_REFRESH_INTERVAL_DAYS = 1
+MAX_REFRESH_INTERVAL_DAYS = 7
+VOLATILITY_WINDOW = 14              # Number of most recent scrapes used to measure volatility
+HIGH_VOLATILITY_RATE = 0.5          # Change rate at which a file is refreshed every run
+
+
+def compute_change_rate(prices, timestamps, today, scrape_counts=None):
+    """Share of consecutive scrape pairs in which the price of a future term changed.
+
+    scrape_counts maps column timestamps to the number of scrapes that returned the
+    column (default 1); the scrapes after the first one are unchanged pairs.
+    """
+    scrape_counts = scrape_counts or {}
+    recent = []
+    scrapes = 0
+    for timestamp in reversed(timestamps):
+        if scrapes >= VOLATILITY_WINDOW:
+            break
+        recent.append(timestamp)
+        scrapes += scrape_counts.get(timestamp, 1)
+    recent.reverse()
+
+    pairs = 0
+    changes = 0
+
+    for term, term_prices in prices.items():
+        if parse_date_from_term(term).date() < today:
+            continue
+        for older, newer in zip(recent, recent[1:]):
+            old_price = term_prices.get(older)
+            new_price = term_prices.get(newer)
+            if old_price is None or new_price is None:
+                continue
+            pairs += 1
+            if old_price != new_price:
+                changes += 1
+        for timestamp in recent:
+            if term_prices.get(timestamp) is not None:
+                pairs += scrape_counts.get(timestamp, 1) - 1
+
+    return changes / pairs if pairs else 0.0
+
+
+def compute_days_to_departure(prices, today):
+    """Days until the nearest future term, or None if the file has no future terms."""
+    days = [(parse_date_from_term(term).date() - today).days for term in prices]
+    future_days = [d for d in days if d >= 0]
+    return min(future_days) if future_days else None
+
+
+def get_refresh_interval(change_rate, days_to_departure):
+    """Refresh interval in days for a file with the given volatility and proximity."""
+    if days_to_departure is not None and days_to_departure <= NEAR_DEPARTURE_WINDOW_DAYS:
+        return MIN_REFRESH_INTERVAL_DAYS
+
+    volatility = min(1.0, change_rate / HIGH_VOLATILITY_RATE)
+    return MAX_REFRESH_INTERVAL_DAYS - (MAX_REFRESH_INTERVAL_DAYS - MIN_REFRESH_INTERVAL_DAYS) * volatility
+
+
+def assess_file(file_path, now, seen_at=None, scrape_counts=None):
+    """Compute the schedule entry of a single CSV file from its history.
+
+    seen_at is the file's "seen at" marker from the scrape state; a scrape that found
+    unchanged prices counts as the latest scrape even though it added no column.
+    scrape_counts are the file's per-column scrape counts from the scrape state.
+    """
+    prices = load_existing_prices(file_path)
+    timestamps = sorted({ts for term_prices in prices.values() for ts in term_prices}, key=timestamp_sort_key)
+    if not timestamps:
+        return None
+
+    today = now.date()
+    change_rate = compute_change_rate(prices, timestamps, today, scrape_counts)
+    days_to_departure = compute_days_to_departure(prices, today)
+    interval = get_refresh_interval(change_rate, days_to_departure)
+    last_scrape = seen_at if is_seen_after(seen_at, timestamps[-1]) else timestamps[-1]
+    elapsed_days = (now - parse_timestamp(last_scrape)).total_seconds() / 86400
+
+    return {
+        "change_rate": change_rate,
+        "days_to_departure": days_to_departure,
+        "interval": interval,
+        "elapsed": elapsed_days,
+        "priority": elapsed_days / interval,
+    }
+
+
+class ScrapeScheduler:
+    """Per-run plan of which files to scrape.
+
+    Files without history (new departures or trips) are always scraped while the
+    budget lasts. A budget of None means no limit.
+    """
+
+    def __init__(self, entries, budget=None):
+        self.entries = entries
+        self.remaining = budget
+
+        # Allow a small tolerance so a file scraped at a slightly later hour is not skipped
+        due = [name for name, entry in entries.items() if entry["priority"] >= 0.95]
+        due.sort(key=lambda name: entries[name]["priority"], reverse=True)
+        self.planned = set(due if budget is None else due[:budget])
+        self.due_count = len(due)
+        self.deferred = []
+
+    @classmethod
+    def from_data_dir(cls, data_dir, budget=None, now=None):
+        now = now or datetime.now()
+        entries = {}
+        if os.path.isdir(data_dir):
+            state = load_scrape_state(get_state_file(data_dir))
+            seen_markers = get_seen_markers(state)
+            scrape_counts = get_scrape_counts(state)
+            for csv_file in sorted(os.listdir(data_dir)):
+                if not csv_file.endswith('.csv'):
+                    continue
+                entry = assess_file(
+                    os.path.join(data_dir, csv_file), now, seen_markers.get(csv_file), scrape_counts.get(csv_file),
+                )
+                if entry:
+                    entries[csv_file[:-len('.csv')]] = entry
+        return cls(entries, budget)
+
+    def has_work(self, file_prefix, person_count):
+        """Check whether a trip combination has any planned or unknown departures.
+
+        Trips without any stored files are always visited so new departures are found.
+        """
+        # File names follow Country__Trip_Name__Departure__XPersons, see generate_file_name()
+        prefix = f"{file_prefix}__"
+        suffix = f"__{person_count}os"
+        known = [name for name in self.entries if name.startswith(prefix) and name.endswith(suffix)]
+        return not known or any(name in self.planned for name in known)
+
+    def should_scrape(self, file_name):
+        """Decide whether to scrape a file now, consuming one request of the budget if so."""
+        if file_name in self.entries and file_name not in self.planned:
+            return False
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                self.deferred.append(file_name)
+                return False
+            self.remaining -= 1
+        return True
+
+    def print_plan(self):
+        intervals = [entry["interval"] for entry in self.entries.values()]
+        print(f"Scheduler: {len(self.entries)} files with history, {self.due_count} due, {len(self.planned)} planned")
+        if intervals:
+            print(f"  Refresh intervals: {min(intervals):.1f} - {max(intervals):.1f} days "
+                  f"(average {sum(intervals) / len(intervals):.1f})")
+
+    def print_summary(self):
+        skipped = len(self.entries) - len(self.planned)
+        print(f"  Units skipped by schedule: {skipped}")
+        if self.deferred:
+            print(f"  Units deferred by request budget: {len(self.deferred)}")
@@ -0,0 +1,118 @@
+"""
+Scrape state for RScraper — remembers the result set last written to every CSV file so
+that a scrape returning exactly the same prices does not add a new column.
+
+Entries are keyed by CSV file name:
+
+    {"hash": sha1 of the written results, "size": file size after the write,
+     "writtenAt": timestamp of the newest column, "seenAt": timestamp of the newest
+     scrape that returned the same results, or null,
+     "scrapes": {column timestamp: number of scrapes that returned it}}
+
+An unchanged scrape only moves "seenAt" and counts one more scrape for the newest
+column; the CSV file keeps its last column, which stays valid until "seenAt".
+generate_deals.py uses the marker to treat such files as unchanged since their newest
+column, and the scheduler to count them as fresh. The scrape counts of the newest
+SCRAPE_COUNT_HISTORY columns let the scheduler measure volatility per scrape rather
+than per column.
+"""
+import os
+import json
+import hashlib
+from price_csv import timestamp_sort_key, normalize_timestamp
+
+STATE_FILE_NAME = "scrape-state.json"
+SCRAPE_COUNT_HISTORY = 30  # Newest columns whose scrape counts are kept
+
+
+def get_state_file(data_dir):
+    return os.path.join(data_dir, STATE_FILE_NAME)
+
+
+def hash_results(results):
+    """Order-independent hash of a scraped result set [(term, price), ...]."""
+    normalized = sorted((term, int(price)) for term, price in results)
+    return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()
+
+
+def load_scrape_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        print(f"Warning: scrape state {state_file} is corrupt, ignoring it")
+        return {}
+
+
+def save_scrape_state(state_file, state):
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_file, state_file)
+
+
+def is_known_unchanged(entry, results_hash, file_path):
+    """Fast check without reading the CSV: same results as the last write, file untouched since.
+
+    The size is compared instead of the modification time, which a git checkout resets.
+    """
+    return (
+        entry is not None
+        and entry.get('writtenAt')
+        and entry.get('hash') == results_hash
+        and os.path.exists(file_path)
+        and os.path.getsize(file_path) == entry.get('size')
+    )
+
+
+def get_entry_scrape_counts(entry):
+    """Return the scrape counts of a state entry.
+
+    Entries from before the counts were kept but with a "seen at" marker count the
+    newest column as scraped twice, the least the marker proves.
+    """
+    if not entry:
+        return {}
+    if entry.get('scrapes'):
+        return entry['scrapes']
+    if entry.get('writtenAt') and is_seen_after(entry.get('seenAt'), entry['writtenAt']):
+        return {normalize_timestamp(entry['writtenAt']): 2}
+    return {}
+
+
+def count_scrape(entry, column_timestamp, written):
+    """Return the scrape counts of a state entry with one more scrape of column_timestamp.
+
+    written is True for the scrape that added the column. Columns written before the
+    counts were kept start at one scrape.
+    """
+    counts = dict(get_entry_scrape_counts(entry))
+    column_timestamp = normalize_timestamp(column_timestamp)
+    counts[column_timestamp] = counts.get(column_timestamp, 0 if written else 1) + 1
+    newest = sorted(counts, key=timestamp_sort_key)[-SCRAPE_COUNT_HISTORY:]
+    return {ts: counts[ts] for ts in newest}
+
+
+def get_scrape_counts(state):
+    """Return {csv file name: {column timestamp: scrapes}} for files with known scrape counts."""
+    result = {}
+    for file_name, entry in state.items():
+        counts = get_entry_scrape_counts(entry)
+        if counts:
+            result[file_name] = counts
+    return result
+
+
+def get_seen_markers(state):
+    """Return {csv file name: seenAt} for files last seen unchanged after their newest column."""
+    return {
+        file_name: entry['seenAt'] for file_name, entry in state.items()
+        if entry.get('seenAt') and timestamp_sort_key(entry['seenAt']) > timestamp_sort_key(entry.get('writtenAt') or '')
+    }
+
+
+def is_seen_after(seen_at, newest_timestamp):
+    """True if a seen marker is newer than the newest column of a file."""
+    return bool(seen_at) and timestamp_sort_key(seen_at) > timestamp_sort_key(newest_timestamp)
@@ -36,6 +36,9 @@ API_HEADERS = {
 KALKULATOR_API_URL = "https://r.pl/api/wyszukiwarka/v5.0/wyszukaj-kalkulator"
 DELAY_BETWEEN_API_CALLS = 1.5  # seconds between API calls
 
+# Shared HTTP session so connections to r.pl are pooled and reused across requests
+session = requests.Session()
+
 # Reactive wrapper tags used in Nuxt 3 payload serialization
 REACTIVE_TAGS = frozenset({
     "ShallowReactive", "Reactive", "Ref", "ShallowRef",
@@ -48,7 +51,7 @@ REACTIVE_TAGS = frozenset({
 def fetch_html(url):
     """Download HTML page content."""
     print(f"Fetching HTML: {url}")
-    response = requests.get(url, headers=HEADERS, timeout=30)
+    response = session.get(url, headers=HEADERS, timeout=30)
     response.raise_for_status()
     return response.text
 
@@ -153,7 +156,7 @@ def fetch_kalkulator(produkt_url, hotel_url, birth_dates, rooms_count, unikalny_
     }
 
     print(f"    Calling kalkulator API...")
-    response = requests.post(KALKULATOR_API_URL, json=payload, headers=API_HEADERS, timeout=30)
+    response = session.post(KALKULATOR_API_URL, json=payload, headers=API_HEADERS, timeout=30)
     response.raise_for_status()
     return response.json()
 
@@ -195,49 +198,52 @@ def extract_dates_and_prices(kalkulator_data):
 
 # --- Main Entry Point ---
 
-def get_all_departures_with_prices(url, age_param, person_count):
-    """Fetch a trip page and return dates+prices for all departure locations.
-
-    Args:
-        url: Full trip page URL (with query params for person count etc.)
-        age_param: Birth date string, e.g. "1995-01-01"
-        person_count: Number of persons
+def fetch_trip_departures(url):
+    """Fetch a trip page and return its departure locations.
 
-    Returns:
-        dict: {departure_name: [(date_range, price_string), ...]}
+    Returns list of dicts: [{"Nazwa": str, "Iata": str, "UnikalnyKluczOferty": str}, ...]
     """
-    # Step 1: Fetch HTML and extract __NUXT_DATA__
     html = fetch_html(url)
     nuxt_data = extract_nuxt_data(html)
+    return extract_departures_from_nuxt(nuxt_data)
 
-    # Step 2: Extract departure locations with their keys
-    departures = extract_departures_from_nuxt(nuxt_data)
 
-    # Step 3: Parse URL parts for API calls
-    produkt_url, hotel_url = parse_url_parts(url)
+class DepartureCatalog:
+    """In-memory cache of departure lists per trip URL, used by long-running processes.
 
-    # Step 4: Build birth dates array
-    birth_dates = [age_param] * person_count
+    Entries expire after `ttl` seconds and are invalidated when a departure of the
+    trip fails, since its UnikalnyKluczOferty may have changed.
+    """
 
-    # Step 5: For each departure, call the kalkulator API
-    all_results = {}
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
 
-    for i, dep in enumerate(departures):
-        nazwa = dep["Nazwa"]
-        klucz = dep["UnikalnyKluczOferty"]
+    def get_departures(self, url):
+        entry = self.entries.get(url)
+        if entry and time.time() - entry[0] < self.ttl:
+            print(f"Using cached departure list for {url}")
+            return entry[1]
 
-        print(f"\n  [{i+1}/{len(departures)}] Departure: {nazwa}")
+        departures = fetch_trip_departures(url)
+        self.entries[url] = (time.time(), departures)
+        return departures
 
-        try:
-            kalk_data = fetch_kalkulator(produkt_url, hotel_url, birth_dates, 1, klucz)
-            results = extract_dates_and_prices(kalk_data)
-            all_results[nazwa] = results
-            print(f"    Found {len(results)} departure dates")
-        except Exception as e:
-            print(f"    Error fetching data for {nazwa}: {e}")
+    def invalidate(self, url):
+        self.entries.pop(url, None)
 
-        # Be polite to the server
-        if i < len(departures) - 1:
-            time.sleep(DELAY_BETWEEN_API_CALLS)
 
-    return all_results
\ No newline at end of file
+def fetch_departure_prices(url, age_param, person_count, departure, on_response=None):
+    """Call the kalkulator API for a single departure and return its dates and prices.
+
+    Errors are propagated to the caller, which decides whether to retry. on_response,
+    if given, receives the raw API response before extraction (e.g. for archiving).
+
+    Returns list of tuples: [("dd.mm.yyyy - dd.mm.yyyy", price_string), ...]
+    """
+    produkt_url, hotel_url = parse_url_parts(url)
+    birth_dates = [age_param] * person_count
+    kalk_data = fetch_kalkulator(produkt_url, hotel_url, birth_dates, 1, departure["UnikalnyKluczOferty"])
+    if on_response:
+        on_response(kalk_data)
+    return extract_dates_and_prices(kalk_data)
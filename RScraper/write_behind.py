@@ -0,0 +1,72 @@
+"""
+Write-behind stage for RScraper runs — merges and persists scraped results on a writer
+thread while the main thread keeps fetching.
+
+The fetching side submits tasks (CSV merges, journal and negative cache updates,
+archive writes) to a bounded queue; the writer thread runs them one at a time in
+submission order, so it is the only thread that mutates run state and files. When the
+queue is full, submit() blocks until the writer catches up, which bounds the memory
+held by pending results.
+
+Closing the writer flushes every pending task, also when the run stops on an error or
+Ctrl+C, so no fetched result is lost. After a failed task the remaining tasks are
+dropped and the error is raised on the fetching side at its next submit() or at close().
+"""
+import queue
+import threading
+
+WRITE_QUEUE_SIZE = 16  # Pending tasks before fetching waits for the writer
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    def __init__(self, max_pending=WRITE_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="rscraper-writer", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if exc_type is None:
+            self.raise_error()
+        return False
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            try:
+                if task is _STOP:
+                    return
+                if self.error is None:
+                    func, args, kwargs = task
+                    func(*args, **kwargs)
+            except BaseException as e:
+                print(f"Error in the writer stage: {e}")
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a task for the writer thread, blocking while the queue is full."""
+        self.raise_error()
+        self.queue.put((func, args, kwargs))
+
+    def flush(self):
+        """Wait until every submitted task has been run."""
+        self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        """Run the pending tasks and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,284 @@
+"""
+Backtest the deal algorithms of generate_deals.py over the full stored price history.
+
+All CSV files in data/ are read once into a time-indexed view: per term the prices of
+every scrape, with running minimum/maximum and the minimum of all later prices. The
+algorithms are then evaluated as of the end of every historical scrape day, for every
+value of a parameter grid, and each flagged deal is checked against what happened next:
+
+- hit:        the price never went below the flagged price later,
+- miss:       a cheaper price appeared before departure (the deal was premature),
+- unresolved: no later scrape of the term exists yet.
+
+Usage:
+    python backtest_deals.py
+    python backtest_deals.py --price-drop 3,5,10 --all-time-low 0,2 --limited --output backtest.json
+"""
+
+import os
+import json
+import argparse
+from bisect import bisect_right
+from datetime import datetime
+
+from generate_deals import (
+    DATA_DIR, COMBINED_SCORE_THRESHOLD, PRICE_DROP_THRESHOLD_PCT, LOWEST_PERCENTILE,
+    ALL_TIME_LOW_MARGIN_PCT, load_sources, parse_csv_filename, parse_date_from_term,
+    find_price_drops, find_lowest_per_trip, find_all_time_lows, find_combined_deals, limit_deals,
+)
+from price_csv import read_price_table, parse_price, parse_timestamp, timestamp_sort_key
+
+# Algorithm name -> (function, keyword argument, default grid)
+ALGORITHMS = {
+    'combined': (find_combined_deals, 'score_threshold', [50, 60, 70, 80]),
+    'priceDrop': (find_price_drops, 'threshold_pct', [2.5, 5.0, 7.5, 10.0, 15.0]),
+    'lowestPerTrip': (find_lowest_per_trip, 'percentile', [5, 10, 20, 30]),
+    'allTimeLow': (find_all_time_lows, 'margin_threshold_pct', [0.0, 1.0, 2.0, 5.0]),
+}
+# Thresholds that only filter an otherwise unchanged result: the algorithm runs once
+# with the loosest grid value and the stricter values filter its deals.
+# Algorithm -> (signal the threshold is compared with, True if larger values are stricter)
+NESTED_THRESHOLDS = {
+    'combined': (lambda deal: deal['score'], True),
+    'priceDrop': (lambda deal: (deal['previousPrice'] - deal['currentPrice']) / deal['previousPrice'] * 100, True),
+    'allTimeLow': (lambda deal: (deal['currentPrice'] - deal['allTimeMin']) / deal['allTimeMin'] * 100, False),
+}
+CURRENT_VALUES = {
+    'combined': COMBINED_SCORE_THRESHOLD,
+    'priceDrop': PRICE_DROP_THRESHOLD_PCT,
+    'lowestPerTrip': LOWEST_PERCENTILE,
+    'allTimeLow': ALL_TIME_LOW_MARGIN_PCT,
+}
+
+
+def running(values, pick):
+    """Running aggregate of valid prices: result[i] covers values[:i + 1] (None until the first price)."""
+    result = []
+    current = None
+    for value in values:
+        if value is not None and value > 0:
+            current = value if current is None else pick(current, value)
+        result.append(current)
+    return result
+
+
+class HistoryView:
+    """Time-indexed view of all CSV histories, built once and queried per scrape day."""
+
+    def __init__(self, files):
+        self.files = files
+        self.days = sorted({day for f in files for day in f['days']})
+
+    @classmethod
+    def load(cls, data_dir, sources_catalog):
+        files = []
+        for csv_file in sorted(os.listdir(data_dir)):
+            file_info = parse_csv_filename(csv_file) if csv_file.endswith('.csv') else None
+            if not file_info:
+                continue
+
+            timestamps, rows = read_price_table(os.path.join(data_dir, csv_file))
+            if timestamps is None:
+                continue
+
+            # Oldest first, skipping columns with unparsable timestamps
+            order = sorted(
+                (i for i, ts in enumerate(timestamps) if timestamp_sort_key(ts)),
+                key=lambda i: timestamp_sort_key(timestamps[i]),
+            )
+            if not order:
+                continue
+
+            result = sources_catalog.find_trip(file_info['tripName'])
+            trip = result[0] if result else file_info['tripName'].replace('_', ' ')
+
+            terms = []
+            for date_range, cells in rows:
+                departure_date = parse_date_from_term(date_range)
+                if departure_date is None:
+                    continue
+                prices = [parse_price(cells[i]) if i < len(cells) else None for i in order]
+                later = running(reversed(prices), min)[::-1]
+                terms.append({
+                    'dateRange': date_range,
+                    'departureDate': departure_date,
+                    'prices': prices,
+                    'runningMin': running(prices, min),
+                    'runningMax': running(prices, max),
+                    # Minimum of the prices strictly after each scrape
+                    'laterMin': later[1:] + [None],
+                })
+
+            files.append({
+                'csvFileName': csv_file,
+                'trip': trip,
+                'airport': file_info['airport'],
+                'persons': file_info['persons'],
+                'days': [parse_timestamp(timestamps[i].strip()).date() for i in order],
+                'terms': terms,
+            })
+
+        return cls(files)
+
+    def terms_as_of(self, day):
+        """Build the terms generate_deals.collect_file_terms would have produced for every file at the end of `day`."""
+        all_terms = []
+        for f in self.files:
+            column = bisect_right(f['days'], day) - 1
+            if column < 0:
+                continue
+
+            for term in f['terms']:
+                if term['departureDate'] < day:
+                    continue
+                current_price = term['prices'][column]
+                if current_price is None or current_price <= 0:
+                    continue
+                previous_price = term['prices'][column - 1] if column > 0 else None
+                if previous_price is not None and previous_price <= 0:
+                    previous_price = None
+
+                all_terms.append({
+                    'trip': f['trip'],
+                    'airport': f['airport'],
+                    'persons': f['persons'],
+                    'csvFileName': f['csvFileName'],
+                    'dateRange': term['dateRange'],
+                    'currentPrice': current_price,
+                    'previousPrice': previous_price,
+                    'allTimeMin': term['runningMin'][column],
+                    'allTimeMax': term['runningMax'][column],
+                    'laterMin': term['laterMin'][column],
+                })
+        return all_terms
+
+
+def new_stats():
+    return {'flagged': 0, 'hits': 0, 'misses': 0, 'unresolved': 0, 'missDropPctSum': 0.0}
+
+
+def record_outcomes(stats, deals):
+    for deal in deals:
+        stats['flagged'] += 1
+        later_min = deal['laterMin']
+        if later_min is None:
+            stats['unresolved'] += 1
+        elif later_min >= deal['currentPrice']:
+            stats['hits'] += 1
+        else:
+            stats['misses'] += 1
+            stats['missDropPctSum'] += (deal['currentPrice'] - later_min) / deal['currentPrice'] * 100
+
+
+def summarize(stats):
+    resolved = stats['hits'] + stats['misses']
+    return {
+        'flagged': stats['flagged'],
+        'resolved': resolved,
+        'unresolved': stats['unresolved'],
+        'hitRate': round(stats['hits'] / resolved * 100, 1) if resolved else None,
+        'averageLaterDropPct': round(stats['missDropPctSum'] / stats['misses'], 1) if stats['misses'] else 0,
+    }
+
+
+def evaluate(name, all_terms, values):
+    """Return {value: deals} for every grid value of one algorithm."""
+    function, argument, _ = ALGORITHMS[name]
+    if name not in NESTED_THRESHOLDS:
+        return {value: function(all_terms, **{argument: value}) for value in values}
+
+    signal, larger_is_stricter = NESTED_THRESHOLDS[name]
+    loosest = min(values) if larger_is_stricter else max(values)
+    candidates = [(signal(deal), deal) for deal in function(all_terms, **{argument: loosest})]
+    return {
+        value: [deal for s, deal in candidates if (s >= value if larger_is_stricter else s <= value)]
+        for value in values
+    }
+
+
+def run_backtest(view, grid, limited=False):
+    """Evaluate every algorithm for every grid value as of every scrape day.
+
+    Each algorithm only depends on its own parameter, so the grid is evaluated per
+    algorithm and the as-of term list of a day is built once for all of them.
+    """
+    stats = {name: {value: new_stats() for value in values} for name, values in grid.items()}
+
+    for day in view.days:
+        all_terms = view.terms_as_of(day)
+        if not all_terms:
+            continue
+        for name, values in grid.items():
+            for value, deals in evaluate(name, all_terms, values).items():
+                record_outcomes(stats[name][value], limit_deals(deals) if limited else deals)
+
+    return {
+        name: [{'value': value, **summarize(s)} for value, s in by_value.items()]
+        for name, by_value in stats.items()
+    }
+
+
+def print_report(report):
+    for name, rows in report.items():
+        _, argument, _ = ALGORITHMS[name]
+        print(f"\n{name} ({argument}, current: {CURRENT_VALUES[name]})")
+        print(f"  {'value':>8} {'flagged':>9} {'resolved':>9} {'hit rate':>9} {'avg later drop':>15}")
+        for row in rows:
+            hit_rate = f"{row['hitRate']}%" if row['hitRate'] is not None else '-'
+            print(f"  {row['value']:>8} {row['flagged']:>9} {row['resolved']:>9} {hit_rate:>9} "
+                  f"{row['averageLaterDropPct']:>14}%")
+
+
+def parse_grid_values(spec):
+    return [float(v) if '.' in v else int(v) for v in spec.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest deal thresholds over the stored price history.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    for name, (_, argument, values) in ALGORITHMS.items():
+        option = '--' + ''.join('-' + c.lower() if c.isupper() else c for c in name)
+        parser.add_argument(option, dest=name, metavar='V1,V2,...',
+                            help=f"grid for {argument} (default: {','.join(map(str, values))})")
+    parser.add_argument('--only', choices=list(ALGORITHMS), action='append',
+                        help='evaluate only the given algorithm(s)')
+    parser.add_argument('--limited', action='store_true',
+                        help='evaluate only the deals that would be shown (limit per person count)')
+    parser.add_argument('--output', help='also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    grid = {}
+    for name, (_, _, values) in ALGORITHMS.items():
+        if args.only and name not in args.only:
+            continue
+        try:
+            grid[name] = parse_grid_values(getattr(args, name)) if getattr(args, name) else values
+        except ValueError:
+            parser.error(f"invalid grid for {name}: {getattr(args, name)}")
+
+    print("=" * 70)
+    print("BACKTEST DEALS — evaluating deal thresholds over the price history")
+    print("=" * 70)
+
+    started_at = datetime.now()
+    view = HistoryView.load(args.data_dir, load_sources())
+    print(f"Loaded {len(view.files)} CSV files, {len(view.days)} scrape days "
+          f"({datetime.now() - started_at})")
+
+    report = run_backtest(view, grid, args.limited)
+    print_report(report)
+    print(f"\nBacktest finished in {datetime.now() - started_at}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generatedAt': datetime.now().replace(microsecond=0).isoformat(timespec='seconds'),
+                'scrapeDays': len(view.days),
+                'limited': args.limited,
+                'algorithms': report,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"✓ Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
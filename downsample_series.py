@@ -0,0 +1,194 @@
+"""
+Generate downsampled price series from CSV price data for charting.
+
+For every future term of every CSV file in data/ this writes:
+1. Daily aggregates (min, max, last price per calendar day) for the last DAILY_WINDOW_DAYS
+2. Weekly aggregates (min, max, last price per ISO week) for the full history
+3. Shape-preserving reduced series (Largest-Triangle-Three-Buckets) at fixed sizes,
+   as [unix time, price] points; scrape timestamps are read as UTC, so the points do
+   not depend on the time zone of the machine generating them
+
+so the explorer can fetch a fixed-size series however long the history grows.
+Files are only regenerated when their CSV file is newer than the existing output.
+
+Output: data/series/{csv file name without .csv}.json
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta, timezone
+
+# Add RScraper directory to path for the shared CSV reader
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, "RScraper"))
+
+from price_csv import read_prices_newest_first, parse_timestamp
+from generate_deals import DATA_DIR, is_future_term
+
+SERIES_DIR = os.path.join(DATA_DIR, "series")
+RESOLUTIONS = (16, 32, 64)   # Number of points in the reduced series
+DAILY_WINDOW_DAYS = 60       # Daily aggregates cover only the most recent days
+
+
+def largest_triangle_three_buckets(points, threshold):
+    """Reduce [(x, y, ...), ...] to `threshold` points, keeping the visual shape of the series.
+
+    The first and last points are always kept; every bucket in between contributes the
+    point forming the largest triangle with the previously selected point and the
+    average of the next bucket.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        bucket_start = int(i * bucket_size) + 1
+        bucket_end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = bucket_end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[selected][0], points[selected][1]
+        best_area = -1
+        best_index = bucket_start
+        for j in range(bucket_start, bucket_end):
+            bx, by = points[j][0], points[j][1]
+            area = abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = j
+
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def aggregate(observations, period_key):
+    """Aggregate [(datetime, timestamp, price), ...] into [[period, min, max, last], ...]."""
+    periods = {}
+    for moment, _, price in observations:
+        key = period_key(moment)
+        if key not in periods:
+            periods[key] = [key, price, price, price]
+        else:
+            bucket = periods[key]
+            bucket[1] = min(bucket[1], price)
+            bucket[2] = max(bucket[2], price)
+            bucket[3] = price
+    return list(periods.values())
+
+
+def iso_week(moment):
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def unix_time(moment):
+    """Unix time of a naive scrape timestamp, read as UTC rather than local time."""
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def downsample_file(file_path):
+    """Build the downsampled series of all future terms in one CSV file."""
+    parsed = read_prices_newest_first(file_path)
+    if not parsed:
+        return None
+
+    # Oldest first, skipping columns with unparsable timestamps
+    columns = []
+    for i, timestamp in enumerate(parsed['timestamps']):
+        try:
+            columns.append((i, timestamp, parse_timestamp(timestamp.strip())))
+        except ValueError:
+            continue
+    columns.reverse()
+
+    terms = []
+    for term in parsed['terms']:
+        if not is_future_term(term['dateRange']):
+            continue
+
+        observations = [
+            (moment, timestamp, term['prices'][i])
+            for i, timestamp, moment in columns
+            if term['prices'][i] is not None and term['prices'][i] > 0
+        ]
+        if not observations:
+            continue
+
+        points = [(unix_time(moment), price) for moment, _, price in observations]
+        reduced = {}
+        for resolution in RESOLUTIONS:
+            sampled = largest_triangle_three_buckets(points, resolution)
+            reduced[str(resolution)] = [list(point) for point in sampled]
+
+        daily_start = observations[-1][0] - timedelta(days=DAILY_WINDOW_DAYS)
+        recent = [o for o in observations if o[0] >= daily_start]
+
+        terms.append({
+            'dateRange': term['dateRange'],
+            'observations': len(observations),
+            'daily': aggregate(recent, lambda moment: moment.date().isoformat()),
+            'weekly': aggregate(observations, iso_week),
+            'reduced': reduced,
+        })
+
+    return terms
+
+
+def main():
+    print("=" * 70)
+    print("DOWNSAMPLE SERIES — building chart-sized price series")
+    print("=" * 70)
+
+    os.makedirs(SERIES_DIR, exist_ok=True)
+    generated_at = datetime.now().replace(microsecond=0).isoformat(timespec='seconds')
+
+    csv_files = sorted(f for f in os.listdir(DATA_DIR) if f.endswith('.csv'))
+    written = 0
+    for csv_file in csv_files:
+        file_path = os.path.join(DATA_DIR, csv_file)
+        output_path = os.path.join(SERIES_DIR, csv_file.replace('.csv', '.json'))
+
+        # Past terms drop out once a day, so outputs older than today are rebuilt as well
+        if os.path.exists(output_path):
+            output_mtime = os.path.getmtime(output_path)
+            is_fresh = datetime.fromtimestamp(output_mtime).date() == datetime.now().date()
+            if is_fresh and output_mtime >= os.path.getmtime(file_path):
+                continue
+
+        terms = downsample_file(file_path)
+        if terms is None:
+            continue
+
+        result = {
+            'generatedAt': generated_at,
+            'fileName': csv_file,
+            'resolutions': list(RESOLUTIONS),
+            'terms': terms,
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, separators=(',', ':'))
+        written += 1
+
+    # Remove outputs of CSV files that no longer exist
+    expected = {f.replace('.csv', '.json') for f in csv_files}
+    for series_file in os.listdir(SERIES_DIR):
+        if series_file.endswith('.json') and series_file not in expected:
+            os.remove(os.path.join(SERIES_DIR, series_file))
+
+    print(f"✓ Downsampled series written for {written} of {len(csv_files)} CSV files to: {SERIES_DIR}")
+
+
+if __name__ == "__main__":
+    main()
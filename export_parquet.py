@@ -0,0 +1,204 @@
+"""
+Export the price history from the CSV files in data/ as a partitioned Parquet dataset.
+
+The wide CSV files (one column per scrape) are reshaped into one row per observed price:
+
+    country, trip, airport (dictionary-encoded strings), term_start, term_end (date32),
+    scraped_at (timestamp), price (int32)
+
+partitioned Hive-style by the country as written in the CSV file names and by persons
+(export/prices/country_key=X/persons=N/).
+The export is incremental: export/prices/_export_state.json keeps the newest exported
+timestamp of every CSV file, and every run appends only the newer scrapes as new
+Parquet files, leaving the existing ones untouched.
+
+Requires pyarrow, which is not a dependency of the scraper itself:
+    pip install pyarrow
+
+Usage:
+    python export_parquet.py [--output-dir export/prices] [--full]
+
+Reading the dataset:
+    import pyarrow.dataset as ds
+    table = ds.dataset("export/prices", format="parquet", partitioning="hive").to_table()
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+from generate_deals import DATA_DIR, load_sources, parse_csv_filename, parse_date_from_term, parse_end_date_from_term
+from price_csv import read_price_table, parse_price, parse_timestamp, timestamp_sort_key
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "export", "prices")
+STATE_FILE_NAME = "_export_state.json"
+STATE_VERSION = 2  # 2: watermarks are ISO-8601 timestamps (v2 CSV header)
+
+
+def import_pyarrow():
+    """Import pyarrow lazily so the rest of the project does not depend on it."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        print("Error: the Parquet export requires pyarrow, install it with: pip install pyarrow")
+        sys.exit(1)
+    return pyarrow, pyarrow.parquet
+
+
+def load_state(output_dir):
+    state_file = os.path.join(output_dir, STATE_FILE_NAME)
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+        print(f"Export state in {output_dir} has an unknown version, starting a full export")
+    return {'version': STATE_VERSION, 'runs': [], 'files': {}}
+
+
+def save_state(output_dir, state):
+    state_file = os.path.join(output_dir, STATE_FILE_NAME)
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def remove_unfinished_runs(output_dir, state):
+    """Delete Parquet files of runs that did not record their state (e.g. interrupted)."""
+    finished = set(state['runs'])
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            if name.startswith('part-') and name.endswith('.parquet'):
+                run_id = name[len('part-'):-len('.parquet')]
+                if run_id not in finished:
+                    os.remove(os.path.join(root, name))
+
+
+def collect_new_rows(data_dir, sources_catalog, state):
+    """Read the scrapes newer than each file's watermark, grouped by (country, persons) partition.
+
+    Returns ({partition: column lists}, {csv file: new watermark}).
+    """
+    partitions = {}
+    watermarks = {}
+
+    for csv_file in sorted(os.listdir(data_dir)):
+        file_info = parse_csv_filename(csv_file) if csv_file.endswith('.csv') else None
+        if not file_info:
+            continue
+
+        timestamps, rows = read_price_table(os.path.join(data_dir, csv_file))
+        if timestamps is None:
+            continue
+
+        watermark = state['files'].get(csv_file, '')
+        new_columns = [
+            (i, parse_timestamp(ts.strip())) for i, ts in enumerate(timestamps)
+            if timestamp_sort_key(ts) > watermark
+        ]
+        if not new_columns:
+            continue
+
+        result = sources_catalog.find_trip(file_info['tripName'])
+        trip = result[0] if result else file_info['tripName'].replace('_', ' ')
+        country = result[1] if result else file_info['country'].replace('_', ' ')
+
+        key = (file_info['country'], file_info['persons'])
+        columns = partitions.setdefault(key, {
+            'country': [], 'trip': [], 'airport': [],
+            'term_start': [], 'term_end': [], 'scraped_at': [], 'price': [],
+        })
+
+        for date_range, cells in rows:
+            term_start = parse_date_from_term(date_range)
+            term_end = parse_end_date_from_term(date_range)
+            if term_start is None:
+                continue
+            for i, scraped_at in new_columns:
+                price = parse_price(cells[i]) if i < len(cells) else None
+                if price is None:
+                    continue
+                columns['country'].append(country)
+                columns['trip'].append(trip)
+                columns['airport'].append(file_info['airport'])
+                columns['term_start'].append(term_start)
+                columns['term_end'].append(term_end)
+                columns['scraped_at'].append(scraped_at)
+                columns['price'].append(price)
+
+        watermarks[csv_file] = max(timestamp_sort_key(timestamps[i]) for i, _ in new_columns)
+
+    return partitions, watermarks
+
+
+def build_table(pa, columns):
+    return pa.table({
+        'country': pa.array(columns['country'], pa.string()).dictionary_encode(),
+        'trip': pa.array(columns['trip'], pa.string()).dictionary_encode(),
+        'airport': pa.array(columns['airport'], pa.string()).dictionary_encode(),
+        'term_start': pa.array(columns['term_start'], pa.date32()),
+        'term_end': pa.array(columns['term_end'], pa.date32()),
+        'scraped_at': pa.array(columns['scraped_at'], pa.timestamp('s')),
+        'price': pa.array(columns['price'], pa.int32()),
+    })
+
+
+def export_parquet(data_dir=DATA_DIR, output_dir=OUTPUT_DIR, full=False):
+    pa, pq = import_pyarrow()
+
+    if full and os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    state = load_state(output_dir)
+    remove_unfinished_runs(output_dir, state)
+
+    partitions, watermarks = collect_new_rows(data_dir, load_sources(), state)
+    if not partitions:
+        print("No new scrapes to export")
+        return 0
+
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    rows = 0
+    for (country, persons), columns in sorted(partitions.items()):
+        if not columns['price']:
+            continue
+        partition_dir = os.path.join(output_dir, f"country_key={country}", f"persons={persons}")
+        os.makedirs(partition_dir, exist_ok=True)
+
+        table = build_table(pa, columns)
+        file_path = os.path.join(partition_dir, f"part-{run_id}.parquet")
+        pq.write_table(table, file_path + '.tmp', use_dictionary=True, compression='snappy')
+        os.replace(file_path + '.tmp', file_path)
+        rows += table.num_rows
+
+    # Files of this run only count once the watermarks are saved
+    state['files'].update(watermarks)
+    state['runs'].append(run_id)
+    save_state(output_dir, state)
+
+    print(f"✓ Exported {rows} prices from {len(watermarks)} CSV files into {len(partitions)} partitions: {output_dir}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the price history as a partitioned Parquet dataset.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--full', action='store_true', help='discard the existing export and start over')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("EXPORT PARQUET — writing the price history as a columnar dataset")
+    print("=" * 70)
+
+    export_parquet(args.data_dir, args.output_dir, args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,29 @@ Generate deals.json from CSV price data.
 
 Reads all CSV files in data/ and identifies attractive travel deals using 4 algorithms:
 1. Combined Score (weighted composite)
-2. Price Drops (newest vs previous scrape)
+2. Price Drops (newest vs previous scrape, taken from the price-change event log when
+   it covers a file's newest scrape)
 3. Lowest per Trip (bottom percentile within a trip)
 4. All-Time Low (current price near historical minimum)
 
-Output: data/deals.json
+cheapest-departures.json lists the cheapest departure airport per term, with price
+spreads across airports; it is a separate file to keep deals.json small.
+
+Files are analyzed one (trip, persons) group at a time, so the terms and price history
+in memory do not grow with the number of trips in sources.json (see iter_file_groups).
+What does grow with the catalog is small per-file or per-output state: the price events
+of every file's newest scrape and the last-minute and cheapest-departure entries that
+are written out.
+
+Output: data/deals.json, data/last-minute.json, data/cheapest-departures.json
 """
 
 import os
 import sys
 import json
 import csv
+import heapq
+import tempfile
 import statistics
 from datetime import datetime, date, timedelta
 
@@ -22,12 +34,17 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 rscraper_dir = os.path.join(script_dir, "RScraper")
 sys.path.insert(0, rscraper_dir)
 
-from config_manager import transliterate_polish
+from catalog import load_catalog
+from price_csv import read_prices_newest_first, timestamp_sort_key
+from price_matrix import read_price_summary
+from price_events import get_events_file, load_latest_events
+from scrape_state import get_state_file, load_scrape_state, get_seen_markers, is_seen_after
 
 DATA_DIR = os.path.join(script_dir, "data")
 SOURCES_FILE = os.path.join(script_dir, "sources.json")
-OUTPUT_FILE = os.path.join(DATA_DIR, "deals.json")
-LAST_MINUTE_OUTPUT_FILE = os.path.join(DATA_DIR, "last-minute.json")
+OUTPUT_FILE_NAME = "deals.json"
+LAST_MINUTE_OUTPUT_FILE_NAME = "last-minute.json"
+CHEAPEST_DEPARTURES_OUTPUT_FILE_NAME = "cheapest-departures.json"
 
 # --- Thresholds ---
 COMBINED_SCORE_THRESHOLD = 60       # Score 0-100, show deals >= 60
@@ -45,58 +62,8 @@ DEAL_REASON_PRIORITY = {
 
 
 def parse_csv_file(file_path):
-    """Parse a CSV file and return structured price data."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    if len(lines) < 2:
-        return None
-
-    # Parse header (timestamps)
-    header = lines[0].strip().split(',')
-    timestamps = header[1:]  # Skip first empty column
-
-    # Sort timestamps newest first
-    def parse_ts(ts):
-        try:
-            return datetime.strptime(ts.strip(), "%d.%m.%Y %H:%M:%S")
-        except ValueError:
-            return datetime.min
-
-    ts_with_idx = [(ts, i) for i, ts in enumerate(timestamps)]
-    ts_with_idx.sort(key=lambda x: parse_ts(x[0]), reverse=True)
-
-    sorted_timestamps = [t[0] for t in ts_with_idx]
-    index_mapping = [t[1] for t in ts_with_idx]
-
-    # Parse data rows
-    terms = []
-    for line in lines[1:]:
-        parts = line.strip().split(',')
-        if len(parts) < 2:
-            continue
-
-        date_range = parts[0]
-        original_prices = parts[1:]
-
-        # Reorder prices by newest-first timestamp order
-        prices = []
-        for orig_idx in index_mapping:
-            if orig_idx < len(original_prices):
-                val = original_prices[orig_idx].strip()
-                prices.append(int(val) if val and val.isdigit() else None)
-            else:
-                prices.append(None)
-
-        terms.append({
-            'dateRange': date_range,
-            'prices': prices,
-        })
-
-    return {
-        'timestamps': sorted_timestamps,
-        'terms': terms,
-    }
+    """Parse a CSV file and return structured price data, newest timestamp first."""
+    return read_prices_newest_first(file_path)
 
 
 def parse_date_from_term(date_range):
@@ -153,123 +120,114 @@ def parse_csv_filename(filename):
     }
 
 
-def reverse_transliterate_name(transliterated_name, sources_config):
-    """Try to find the original Polish name from sources.json matching a transliterated name."""
-    trips = sources_config.get('trips', {})
-
-    # Try trip names
-    for original_name, details in trips.items():
-        if transliterate_polish(original_name) == transliterated_name:
-            return original_name, details.get('country', ''), details.get('base_url', '')
-
-    return None
-
-
 def load_sources():
-    """Load sources.json configuration."""
-    with open(SOURCES_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Load the compiled catalog of sources.json (names, reverse mappings, offer URLs)."""
+    return load_catalog(SOURCES_FILE)
 
 
-def build_offer_url(sources_config, trip_name_original, persons):
-    """Build the r.pl offer URL for a trip."""
-    trips = sources_config.get('trips', {})
-    trip_config = trips.get(trip_name_original)
-    if not trip_config:
-        return None
-
-    age_param = sources_config.get('global_config', {}).get('age_param', '1995-01-01')
-    base_url = trip_config['base_url']
-    age_params = '&'.join([f'wiek={age_param}' for _ in range(persons)])
-    return f"{base_url}?czyCenaZaWszystkich=1&{age_params}&liczbaPokoi=1"
-
-
-def collect_all_data(data_dir, sources_config):
-    """Read all CSV files and collect term-level data."""
-    all_terms = []
+def collect_file_terms(data_dir, csv_file, sources_catalog, seen_at=None):
+    """Read one CSV file and return its future terms with current and historical prices.
 
-    csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-
-    for csv_file in csv_files:
-        file_info = parse_csv_filename(csv_file)
-        if not file_info:
+    seen_at is the scrape state's "seen at" marker of the file: when it is newer than the
+    newest column, the prices were confirmed unchanged since, so the previous price is
+    the current one.
+    """
+    file_info = parse_csv_filename(csv_file)
+    if not file_info:
+        return []
+
+    # Only the two newest prices and the historical min/max are needed per term
+    file_path = os.path.join(data_dir, csv_file)
+    parsed = read_price_summary(file_path, tail=2)
+    if not parsed:
+        return []
+
+    # Reverse-lookup original names from sources.json
+    result = sources_catalog.find_trip(file_info['tripName'])
+    if result:
+        trip_original, country_original, base_url = result
+    else:
+        trip_original = file_info['tripName'].replace('_', ' ')
+        country_original = file_info['country'].replace('_', ' ')
+        base_url = ''
+
+    offer_url = sources_catalog.offer_url(trip_original, file_info['persons']) or ''
+    unchanged_since_newest = is_seen_after(seen_at, parsed['timestamps'][0])
+
+    file_terms = []
+    for term in parsed['terms']:
+        # Skip past terms
+        if not is_future_term(term['dateRange']):
             continue
 
-        file_path = os.path.join(data_dir, csv_file)
-        parsed = parse_csv_file(file_path)
-        if not parsed or not parsed['terms']:
+        departure_date = parse_date_from_term(term['dateRange'])
+        return_date = parse_end_date_from_term(term['dateRange'])
+        if departure_date is None or return_date is None:
             continue
 
-        # Reverse-lookup original names from sources.json
-        result = reverse_transliterate_name(file_info['tripName'], sources_config)
-        if result:
-            trip_original, country_original, base_url = result
-        else:
-            trip_original = file_info['tripName'].replace('_', ' ')
-            country_original = file_info['country'].replace('_', ' ')
-            base_url = ''
-
-        offer_url = build_offer_url(sources_config, trip_original, file_info['persons']) or ''
-
-        for term in parsed['terms']:
-            # Skip past terms
-            if not is_future_term(term['dateRange']):
-                continue
-
-            departure_date = parse_date_from_term(term['dateRange'])
-            return_date = parse_end_date_from_term(term['dateRange'])
-            if departure_date is None or return_date is None:
-                continue
-
-            # Current price = newest timestamp (index 0)
-            current_price = term['prices'][0] if term['prices'] else None
-            if current_price is None or current_price <= 0:
-                continue  # Sold out or invalid
+        # Current price = newest timestamp (index 0)
+        current_price = term['prices'][0]
+        if current_price is None or current_price <= 0:
+            continue  # Sold out or invalid
 
-            # Previous price = second newest timestamp (index 1)
+        # Previous price = second newest timestamp (index 1)
+        previous_price = term['prices'][1]
+        if previous_price is not None and previous_price <= 0:
             previous_price = None
-            if len(term['prices']) > 1:
-                previous_price = term['prices'][1]
-                if previous_price is not None and previous_price <= 0:
-                    previous_price = None
-
-            # All valid historical prices
-            all_prices = [p for p in term['prices'] if p is not None and p > 0]
-            all_time_min = min(all_prices) if all_prices else current_price
-            all_time_max = max(all_prices) if all_prices else current_price
-
-            all_terms.append({
-                'country': country_original,
-                'trip': trip_original,
-                'airport': file_info['airport'],
-                'persons': file_info['persons'],
-                'dateRange': term['dateRange'],
-                'departureDate': departure_date,
-                'returnDate': return_date,
-                'tripLengthDays': (return_date - departure_date).days + 1,
-                'currentPrice': current_price,
-                'previousPrice': previous_price,
-                'allTimeMin': all_time_min,
-                'allTimeMax': all_time_max,
-                'csvFileName': csv_file,
-                'offerUrl': offer_url,
-            })
-
-    return all_terms
+        if unchanged_since_newest:
+            previous_price = current_price
+
+        # All valid historical prices
+        all_time_min = term['min'] if term['min'] is not None else current_price
+        all_time_max = term['max'] if term['max'] is not None else current_price
+
+        file_terms.append({
+            'country': country_original,
+            'trip': trip_original,
+            'airport': file_info['airport'],
+            'persons': file_info['persons'],
+            'dateRange': term['dateRange'],
+            'departureDate': departure_date,
+            'returnDate': return_date,
+            'tripLengthDays': (return_date - departure_date).days + 1,
+            'currentPrice': current_price,
+            'previousPrice': previous_price,
+            'allTimeMin': all_time_min,
+            'allTimeMax': all_time_max,
+            'csvFileName': csv_file,
+            'offerUrl': offer_url,
+            'scrapedAt': parsed['timestamps'][0],
+        })
+
+    return file_terms
 
 
 # --- Algorithm A: Price Drops ---
-def find_price_drops(all_terms):
-    """Find terms where price dropped significantly from previous scrape."""
+def find_price_drops(all_terms, latest_events=None, threshold_pct=PRICE_DROP_THRESHOLD_PCT):
+    """Find terms where price dropped significantly from previous scrape.
+
+    latest_events (see price_events.load_latest_events) lists the terms whose price
+    changed in the newest scrape of each file; terms of covered files without a
+    'changed' event are skipped. Files not covered by the log are scanned in full.
+    The events only filter the full term list and give the same deals as the full
+    scan; the terms themselves still come from reading every CSV file.
+    """
     deals = []
     for term in all_terms:
+        file_events = latest_events.get(term['csvFileName']) if latest_events else None
+        # Events written before the v2 header still carry legacy timestamps
+        if file_events and timestamp_sort_key(file_events['timestamp']) == term['scrapedAt']:
+            event = file_events['terms'].get(term['dateRange'])
+            if not event or event['type'] != 'changed':
+                continue
+
         prev = term['previousPrice']
         curr = term['currentPrice']
         if prev is None or prev <= 0:
             continue
 
         drop_pct = ((prev - curr) / prev) * 100
-        if drop_pct >= PRICE_DROP_THRESHOLD_PCT:
+        if drop_pct >= threshold_pct:
             deal = {**term, 'score': min(100, int(drop_pct * 3)), 'reason': 'priceDrop',
                     'dropPercent': round(drop_pct, 1), 'dropAbsolute': prev - curr}
             deals.append(deal)
@@ -279,7 +237,7 @@ def find_price_drops(all_terms):
 
 
 # --- Algorithm B: Lowest per Trip ---
-def find_lowest_per_trip(all_terms):
+def find_lowest_per_trip(all_terms, percentile=LOWEST_PERCENTILE):
     """Find terms that are in the bottom percentile of prices within their trip."""
     # Group by trip + persons
     groups = {}
@@ -294,7 +252,7 @@ def find_lowest_per_trip(all_terms):
             continue  # Need enough data to compute percentile
 
         prices_sorted = sorted(prices)
-        threshold_idx = max(0, int(len(prices_sorted) * LOWEST_PERCENTILE / 100))
+        threshold_idx = max(0, int(len(prices_sorted) * percentile / 100))
         threshold_price = prices_sorted[threshold_idx]
 
         median_price = statistics.median(prices)
@@ -311,7 +269,7 @@ def find_lowest_per_trip(all_terms):
 
 
 # --- Algorithm C: All-Time Low ---
-def find_all_time_lows(all_terms):
+def find_all_time_lows(all_terms, margin_threshold_pct=ALL_TIME_LOW_MARGIN_PCT):
     """Find terms where current price is at or near historical minimum."""
     deals = []
     for term in all_terms:
@@ -323,7 +281,7 @@ def find_all_time_lows(all_terms):
             continue  # No meaningful history
 
         margin_pct = ((curr - atm) / atm) * 100
-        if margin_pct <= ALL_TIME_LOW_MARGIN_PCT:
+        if margin_pct <= margin_threshold_pct:
             # Score based on how much range exists (bigger range = more meaningful)
             price_range_pct = ((atx - atm) / atm) * 100
             score = min(100, int(price_range_pct * 5))
@@ -336,7 +294,7 @@ def find_all_time_lows(all_terms):
 
 
 # --- Algorithm D: Combined Score ---
-def find_combined_deals(all_terms):
+def find_combined_deals(all_terms, score_threshold=COMBINED_SCORE_THRESHOLD):
     """Combined scoring using weighted signals from all algorithms."""
     deals = []
 
@@ -389,7 +347,7 @@ def find_combined_deals(all_terms):
                 reasons.append('lowestPerTrip')
 
         score = min(100, int(score))
-        if score >= COMBINED_SCORE_THRESHOLD:
+        if score >= score_threshold:
             primary_reason = reasons[0] if reasons else 'combined'
             deal = {**term, 'score': score, 'reason': primary_reason}
             deals.append(deal)
@@ -458,6 +416,68 @@ def build_deal_index(*deal_groups):
     return deal_index
 
 
+# --- Cross-airport view ---
+def build_cross_airport_index(all_terms):
+    """Index terms by (trip, persons, dateRange) across all departure airports."""
+    index = {}
+    for term in all_terms:
+        key = (term['trip'], term['persons'], term['dateRange'])
+        index.setdefault(key, []).append(term)
+    return index
+
+
+def build_cheapest_departures(cross_airport_index):
+    """Pick the cheapest departure airport per term and compute price spreads across airports.
+
+    Only terms offered from at least two airports are listed.
+    """
+    entries = []
+    for (trip, persons, date_range), terms in cross_airport_index.items():
+        if len(terms) < 2:
+            continue
+
+        cheapest = min(terms, key=lambda t: (t['currentPrice'], t['airport']))
+        max_price = max(t['currentPrice'] for t in terms)
+        spread = max_price - cheapest['currentPrice']
+
+        entries.append({
+            'country': cheapest['country'],
+            'trip': trip,
+            'persons': persons,
+            'dateRange': date_range,
+            'departureDate': cheapest['departureDate'],
+            'airport': cheapest['airport'],
+            'currentPrice': cheapest['currentPrice'],
+            'maxPrice': max_price,
+            'spread': spread,
+            'spreadPercent': round(spread / cheapest['currentPrice'] * 100, 1),
+            'airportCount': len(terms),
+            'csvFileName': cheapest['csvFileName'],
+            'offerUrl': cheapest.get('offerUrl', ''),
+        })
+
+    entries.sort(key=lambda e: (e['trip'], e['persons'], e['departureDate']))
+    for entry in entries:
+        del entry['departureDate']
+
+    return summarize_cheapest_departures(entries, len(cross_airport_index))
+
+
+def summarize_cheapest_departures(entries, term_count):
+    """Wrap cheapest-departure entries with their spread statistics."""
+    spreads = [e['spreadPercent'] for e in entries]
+    return {
+        'label': 'Cheapest Departures',
+        'stats': {
+            'terms': term_count,
+            'multiAirportTerms': len(entries),
+            'averageSpreadPercent': round(statistics.mean(spreads), 1) if spreads else 0,
+            'maxSpreadPercent': max(spreads) if spreads else 0,
+        },
+        'entries': entries,
+    }
+
+
 def build_last_minute_feed(all_terms, generated_at, deal_index):
     """Build a dedicated Last Minute feed enriched with deal metadata."""
     today = generated_at.date()
@@ -505,97 +525,293 @@ def build_last_minute_feed(all_terms, generated_at, deal_index):
     }
 
 
-def main():
-    print("=" * 70)
-    print("GENERATE DEALS — analyzing CSV data for travel deals")
-    print("=" * 70)
+# --- Streaming pipeline ---
+# Files are streamed one (trip, persons) group at a time: every algorithm only compares
+# terms within a trip (or per term), so each group is analyzed on its own. Across groups
+# only the top deals per section and person count, the last-minute entries (spilled to
+# disk in sorted runs) and the cheapest-departure entries are kept. The full terms and
+# price histories are therefore only held for the largest trip; besides the output
+# entries, only the newest-scrape events (load_latest_events) are loaded per file.
+
+DEALS_LIMIT_PER_PERSON = 30
+LIMITED_PERSON_COUNTS = (1, 2)       # limit_deals keeps deals of these person counts
+SPILL_SIZE = 20000                   # feed entries kept in memory before spilling a sorted run
+
+# Section -> (algorithm, sort value of its deals, whether ties are ordered by trip group first);
+# otherwise ties keep the file/term order of the directory listing (see iter_file_groups)
+SECTION_ALGORITHMS = {
+    'combined': (find_combined_deals, lambda deal: deal['score'], False),
+    'priceDrops': (find_price_drops, lambda deal: deal['dropPercent'], False),
+    'lowestPerTrip': (find_lowest_per_trip, lambda deal: deal['score'], True),
+    'allTimeLow': (find_all_time_lows, lambda deal: deal['score'], False),
+}
 
-    sources_config = load_sources()
-    print(f"Loaded sources.json with {len(sources_config.get('trips', {}))} trips")
 
-    all_terms = collect_all_data(DATA_DIR, sources_config)
-    print(f"Collected {len(all_terms)} future terms from CSV files")
+class TopDeals:
+    """The best `limit` deals per limited person count, in the order the full sort would give."""
 
-    generated_at = datetime.now().replace(microsecond=0)
+    def __init__(self, sort_value, limit=DEALS_LIMIT_PER_PERSON):
+        self.sort_value = sort_value
+        self.limit = limit
+        self.heaps = {persons: [] for persons in LIMITED_PERSON_COUNTS}
+        self.count = 0
+
+    def add(self, deals, group_seq=None):
+        """Add a group's deals; group_seq puts ties in trip group order before term order."""
+        self.count += len(deals)
+        for deal in deals:
+            heap = self.heaps.get(deal['persons'])
+            if heap is None:
+                continue
+            # Min-heap of the kept deals: a lower value, or a later position on ties, is worse
+            position = (group_seq or ()) + deal['seq']
+            item = (self.sort_value(deal), tuple(-p for p in position), deal)
+            if len(heap) < self.limit:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+    def limited(self):
+        """Equivalent of limit_deals() applied to the fully sorted deal list."""
+        candidates = [item for heap in self.heaps.values() for item in heap]
+        candidates.sort(key=lambda item: item[:2], reverse=True)
+        return limit_deals([item[2] for item in candidates], self.limit)
+
+
+class SpillSorter:
+    """Sort items by key without keeping them all in memory.
+
+    Items are buffered and written to temporary files in sorted runs of at most
+    max_items, then merged lazily. Keys and items must be JSON-serializable; keys are
+    lists so that buffered and re-read keys compare alike.
+    """
+
+    def __init__(self, tmp_dir, max_items=SPILL_SIZE):
+        self.tmp_dir = tmp_dir
+        self.max_items = max_items
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, key, item):
+        self.buffer.append((key, item))
+        self.count += 1
+        if len(self.buffer) >= self.max_items:
+            self.spill()
+
+    def spill(self):
+        self.buffer.sort(key=lambda pair: pair[0])
+        run_file = os.path.join(self.tmp_dir, f"run-{id(self)}-{len(self.runs)}.jsonl")
+        with open(run_file, 'w', encoding='utf-8') as f:
+            for pair in self.buffer:
+                f.write(json.dumps(pair, ensure_ascii=False) + '\n')
+        self.runs.append(run_file)
+        self.buffer = []
+
+    def _read_run(self, run_file):
+        with open(run_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __iter__(self):
+        self.buffer.sort(key=lambda pair: pair[0])
+        runs = [self._read_run(run_file) for run_file in self.runs] + [iter(self.buffer)]
+        for _, item in heapq.merge(*runs, key=lambda pair: pair[0]):
+            yield item
+
+
+def iter_file_groups(data_dir, sources_catalog):
+    """Yield (trip, persons, terms) per group of CSV files, ordered by trip name and persons.
+
+    Groups are formed from the file names alone; only one group's terms are in memory
+    at a time. Every term gets a 'seq' (file position in the directory listing, term
+    position), which orders ties the same way in every section and feed.
+    """
+    csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
+    seen_markers = get_seen_markers(load_scrape_state(get_state_file(data_dir)))
+
+    groups = {}
+    for file_pos, csv_file in enumerate(csv_files):
+        file_info = parse_csv_filename(csv_file)
+        if not file_info:
+            continue
+        result = sources_catalog.find_trip(file_info['tripName'])
+        trip = result[0] if result else file_info['tripName'].replace('_', ' ')
+        groups.setdefault((trip, file_info['persons']), []).append((file_pos, csv_file))
+
+    for (trip, persons), files in sorted(groups.items()):
+        terms = []
+        for file_pos, csv_file in files:
+            file_terms = collect_file_terms(data_dir, csv_file, sources_catalog, seen_markers.get(csv_file))
+            for term_pos, term in enumerate(file_terms):
+                term['seq'] = (file_pos, term_pos)
+                terms.append(term)
+        yield trip, persons, terms
+
+
+def last_minute_sort_key(entry, seq):
+    return [
+        entry['departureDate'],
+        0 if entry['isDeal'] else 1,
+        entry['currentPrice'],
+        entry['trip'],
+        entry['airport'],
+        *seq,
+    ]
+
+
+def analyze_groups(groups, latest_events, generated_at, tmp_dir):
+    """Run the deal algorithms group by group and keep only the bounded global state."""
+    top_deals = {section: TopDeals(sort_value) for section, (_, sort_value, _) in SECTION_ALGORITHMS.items()}
+    last_minute = SpillSorter(tmp_dir)
+    cheapest = []
+    stats = {'terms': 0, 'indexedTerms': 0}
 
-    if not all_terms:
-        print("No future terms found. Creating empty deals.json and last-minute.json.")
-        deals_result = {
+    for _, _, terms in groups:
+        if not terms:
+            continue
+        stats['terms'] += len(terms)
+
+        group_seq = min(t['seq'] for t in terms)
+        section_deals = {}
+        for section, (algorithm, _, by_group) in SECTION_ALGORITHMS.items():
+            if algorithm is find_price_drops:
+                section_deals[section] = algorithm(terms, latest_events)
+            else:
+                section_deals[section] = algorithm(terms)
+            top_deals[section].add(section_deals[section], group_seq if by_group else None)
+
+        # Deal metadata only concerns single terms, so the group's deals are enough
+        deal_index = build_deal_index(*section_deals.values())
+        seqs = {(t['csvFileName'], t['dateRange'], t['persons']): t['seq'] for t in terms}
+        for entry in build_last_minute_feed(terms, generated_at, deal_index)['entries']:
+            seq = seqs[(entry['csvFileName'], entry['dateRange'], entry['persons'])]
+            last_minute.add(last_minute_sort_key(entry, seq), entry)
+
+        # Groups arrive ordered by trip and persons, which is the order of the entries
+        group_cheapest = build_cheapest_departures(build_cross_airport_index(terms))
+        stats['indexedTerms'] += group_cheapest['stats']['terms']
+        cheapest.extend(group_cheapest['entries'])
+
+    return top_deals, last_minute, cheapest, stats
+
+
+def generate_deals(sources_catalog, data_dir=DATA_DIR):
+    """Analyze the CSV files in data_dir and write deals.json, last-minute.json and cheapest-departures.json."""
+    output_file = os.path.join(data_dir, OUTPUT_FILE_NAME)
+    last_minute_output_file = os.path.join(data_dir, LAST_MINUTE_OUTPUT_FILE_NAME)
+    cheapest_output_file = os.path.join(data_dir, CHEAPEST_DEPARTURES_OUTPUT_FILE_NAME)
+
+    generated_at = datetime.now().replace(microsecond=0)
+    latest_events = load_latest_events(get_events_file(data_dir))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        groups = iter_file_groups(data_dir, sources_catalog)
+        top_deals, last_minute, cheapest, stats = analyze_groups(groups, latest_events, generated_at, tmp_dir)
+        print(f"Collected {stats['terms']} future terms from CSV files")
+
+        if not stats['terms']:
+            print("No future terms found. Creating empty deals.json, last-minute.json and cheapest-departures.json.")
+            deals_result = {
+                "generatedAt": generated_at.isoformat(timespec='seconds'),
+                "sections": {},
+            }
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(deals_result, f, ensure_ascii=False, indent=2)
+
+            last_minute_result = {
+                'generatedAt': generated_at.isoformat(timespec='seconds'),
+                'maxWindowDays': LAST_MINUTE_MAX_WINDOW_DAYS,
+                'entries': [],
+            }
+            with open(last_minute_output_file, 'w', encoding='utf-8') as f:
+                json.dump(last_minute_result, f, ensure_ascii=False, indent=2)
+
+            cheapest_result = {'generatedAt': generated_at.isoformat(timespec='seconds')}
+            cheapest_result.update(build_cheapest_departures({}))
+            with open(cheapest_output_file, 'w', encoding='utf-8') as f:
+                json.dump(cheapest_result, f, ensure_ascii=False, indent=2)
+            return
+
+        print(f"\nRaw Results:")
+        print(f"  Combined Score (D):  {top_deals['combined'].count} deals")
+        print(f"  Price Drops (A):     {top_deals['priceDrops'].count} deals")
+        print(f"  Lowest per Trip (B): {top_deals['lowestPerTrip'].count} deals")
+        print(f"  All-Time Low (C):    {top_deals['allTimeLow'].count} deals")
+
+        # Limit deals to avoid massive JSON file
+        combined = top_deals['combined'].limited()
+        price_drops = top_deals['priceDrops'].limited()
+        lowest = top_deals['lowestPerTrip'].limited()
+        all_time_low = top_deals['allTimeLow'].limited()
+
+        print(f"\nLimited Results (Max 60 per section):")
+        print(f"  Combined Score (D):  {len(combined)} deals")
+        print(f"  Price Drops (A):     {len(price_drops)} deals")
+        print(f"  Lowest per Trip (B): {len(lowest)} deals")
+        print(f"  All-Time Low (C):    {len(all_time_low)} deals")
+
+        cheapest_departures = summarize_cheapest_departures(cheapest, stats['indexedTerms'])
+        print(f"\nCheapest departures: {cheapest_departures['stats']['multiAirportTerms']} terms "
+              f"offered from several airports (max spread {cheapest_departures['stats']['maxSpreadPercent']}%)")
+
+        result = {
             "generatedAt": generated_at.isoformat(timespec='seconds'),
-            "sections": {}
+            "sections": {
+                "combined": {
+                    "label": "Top Deals",
+                    "deals": [clean_deal_for_json(d) for d in combined],
+                },
+                "priceDrops": {
+                    "label": "Price Drops",
+                    "deals": [clean_deal_for_json(d) for d in price_drops],
+                },
+                "lowestPerTrip": {
+                    "label": "Lowest Prices",
+                    "deals": [clean_deal_for_json(d) for d in lowest],
+                },
+                "allTimeLow": {
+                    "label": "All-Time Lows",
+                    "deals": [clean_deal_for_json(d) for d in all_time_low],
+                },
+            },
         }
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(deals_result, f, ensure_ascii=False, indent=2)
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
 
         last_minute_result = {
             'generatedAt': generated_at.isoformat(timespec='seconds'),
             'maxWindowDays': LAST_MINUTE_MAX_WINDOW_DAYS,
-            'entries': [],
+            'entries': list(last_minute),
         }
-        with open(LAST_MINUTE_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(last_minute_result, f, ensure_ascii=False, indent=2)
-        return
-
-    # Run all 4 algorithms
-    combined = find_combined_deals(all_terms)
-    price_drops = find_price_drops(all_terms)
-    lowest = find_lowest_per_trip(all_terms)
-    all_time_low = find_all_time_lows(all_terms)
-    deal_index = build_deal_index(combined, price_drops, lowest, all_time_low)
-
-    print(f"\nRaw Results:")
-    print(f"  Combined Score (D):  {len(combined)} deals")
-    print(f"  Price Drops (A):     {len(price_drops)} deals")
-    print(f"  Lowest per Trip (B): {len(lowest)} deals")
-    print(f"  All-Time Low (C):    {len(all_time_low)} deals")
-
-    # Limit deals to avoid massive JSON file
-    combined = limit_deals(combined)
-    price_drops = limit_deals(price_drops)
-    lowest = limit_deals(lowest)
-    all_time_low = limit_deals(all_time_low)
-    
-    print(f"\nLimited Results (Max 60 per section):")
-    print(f"  Combined Score (D):  {len(combined)} deals")
-    print(f"  Price Drops (A):     {len(price_drops)} deals")
-    print(f"  Lowest per Trip (B): {len(lowest)} deals")
-    print(f"  All-Time Low (C):    {len(all_time_low)} deals")
-
-    result = {
-        "generatedAt": generated_at.isoformat(timespec='seconds'),
-        "sections": {
-            "combined": {
-                "label": "Top Deals",
-                "deals": [clean_deal_for_json(d) for d in combined],
-            },
-            "priceDrops": {
-                "label": "Price Drops",
-                "deals": [clean_deal_for_json(d) for d in price_drops],
-            },
-            "lowestPerTrip": {
-                "label": "Lowest Prices",
-                "deals": [clean_deal_for_json(d) for d in lowest],
-            },
-            "allTimeLow": {
-                "label": "All-Time Lows",
-                "deals": [clean_deal_for_json(d) for d in all_time_low],
-            },
-        }
-    }
 
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-
-    last_minute_result = build_last_minute_feed(all_terms, generated_at, deal_index)
+        with open(last_minute_output_file, 'w', encoding='utf-8') as f:
+            json.dump(last_minute_result, f, ensure_ascii=False, indent=2)
 
-    with open(LAST_MINUTE_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(last_minute_result, f, ensure_ascii=False, indent=2)
+        # Kept out of deals.json, which the dashboard loads on every page view
+        cheapest_result = {'generatedAt': generated_at.isoformat(timespec='seconds')}
+        cheapest_result.update(cheapest_departures)
+        with open(cheapest_output_file, 'w', encoding='utf-8') as f:
+            json.dump(cheapest_result, f, ensure_ascii=False, indent=2)
 
-    print(f"\n✓ Deals saved to: {OUTPUT_FILE}")
+    print(f"\n✓ Deals saved to: {output_file}")
     total = len(combined) + len(price_drops) + len(lowest) + len(all_time_low)
     print(f"  Total deal entries: {total}")
-    print(f"✓ Last Minute feed saved to: {LAST_MINUTE_OUTPUT_FILE}")
-    print(f"  Total Last Minute entries: {len(last_minute_result['entries'])}")
+    print(f"✓ Last Minute feed saved to: {last_minute_output_file}")
+    print(f"  Total Last Minute entries: {last_minute.count}")
+    print(f"✓ Cheapest departures saved to: {cheapest_output_file}")
+
+
+def main():
+    print("=" * 70)
+    print("GENERATE DEALS — analyzing CSV data for travel deals")
+    print("=" * 70)
+
+    sources_catalog = load_sources()
+    print(f"Loaded sources.json with {len(sources_catalog.trips)} trips")
+
+    generate_deals(sources_catalog)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+"""
+Local read-only query service over the CSV price history in data/.
+
+Answers questions like "price history of trip X from Katowice for 2 people" without
+opening CSV files by hand:
+- an in-memory index of files by country / trip / airport / persons and of their terms,
+- an LRU cache of parsed files (generate_deals.parse_csv_file) with eviction,
+- filters by term start date and by scrape timestamp,
+- HTTP responses with ETags derived from the underlying files.
+
+Usage:
+    python query_prices.py query --trip "Wielobarwna Mozaika" --airport Katowice --persons 2
+    python query_prices.py serve --port 8765
+    curl "http://localhost:8765/series?trip=Wielobarwna%20Mozaika&airport=Katowice&persons=2"
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import urlparse, parse_qs
+
+from generate_deals import (
+    DATA_DIR, load_sources, parse_csv_file, parse_csv_filename,
+    parse_date_from_term,
+)
+from config_manager import transliterate_polish
+from price_csv import iter_lines, parse_timestamp
+
+DEFAULT_PORT = 8765
+CACHE_SIZE = 64  # parsed files kept in memory
+
+FILTER_FIELDS = ('country', 'trip', 'airport', 'persons', 'term')
+
+
+def normalize(value):
+    """Normalize a name for matching: transliterated, case-insensitive, spaces as underscores."""
+    return transliterate_polish(str(value).strip()).lower()
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class SeriesCache:
+    """LRU cache of parsed CSV files, invalidated when a file changes on disk."""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, file_path, signature):
+        with self.lock:
+            cached = self.entries.get(file_path)
+            if cached and cached[0] == signature:
+                self.entries.move_to_end(file_path)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        parsed = parse_csv_file(file_path)
+
+        with self.lock:
+            self.entries[file_path] = (signature, parsed)
+            self.entries.move_to_end(file_path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        return parsed
+
+
+class PriceIndex:
+    """In-memory index of the CSV files and their terms."""
+
+    def __init__(self, data_dir, sources_catalog, cache_size=CACHE_SIZE):
+        self.data_dir = data_dir
+        self.sources_catalog = sources_catalog
+        self.cache = SeriesCache(cache_size)
+        self.files = {}
+        self.lock = Lock()
+
+    def file_signature(self, file_name):
+        stat = os.stat(os.path.join(self.data_dir, file_name))
+        return stat.st_mtime_ns, stat.st_size
+
+    def read_terms(self, file_name):
+        """Read only the first column of a file to index its terms."""
+        lines = iter_lines(os.path.join(self.data_dir, file_name))
+        next(lines, None)
+        return [line.split(',', 1)[0] for line in lines if ',' in line]
+
+    def refresh(self):
+        """Re-scan the data directory; files are only re-read when they changed."""
+        with self.lock:
+            files = {}
+            for file_name in sorted(os.listdir(self.data_dir)):
+                file_info = parse_csv_filename(file_name) if file_name.endswith('.csv') else None
+                if not file_info:
+                    continue
+
+                signature = self.file_signature(file_name)
+                entry = self.files.get(file_name)
+                if entry and entry['signature'] == signature:
+                    files[file_name] = entry
+                    continue
+
+                result = self.sources_catalog.find_trip(file_info['tripName'])
+                trip = result[0] if result else file_info['tripName'].replace('_', ' ')
+                country = result[1] if result else file_info['country'].replace('_', ' ')
+                files[file_name] = {
+                    'country': country,
+                    'trip': trip,
+                    'airport': file_info['airport'],
+                    'persons': file_info['persons'],
+                    'fileName': file_name,
+                    'signature': signature,
+                    'terms': self.read_terms(file_name),
+                    'keys': {
+                        'country': normalize(country),
+                        'trip': normalize(trip),
+                        'airport': normalize(file_info['airport']),
+                        'persons': str(file_info['persons']),
+                    },
+                }
+
+            self.files = files
+
+    def find_files(self, filters):
+        """Return index entries matching the country/trip/airport/persons/term filters."""
+        self.refresh()
+        wanted = {k: (str(v) if k == 'persons' else normalize(v)) for k, v in filters.items()
+                  if k in FILTER_FIELDS and k != 'term' and v not in (None, '')}
+        term = filters.get('term')
+
+        matches = []
+        for entry in self.files.values():
+            if any(entry['keys'][k] != v for k, v in wanted.items()):
+                continue
+            if term and term not in entry['terms']:
+                continue
+            matches.append(entry)
+        return matches
+
+    def etag(self, entries, query):
+        digest = hashlib.sha1(query.encode('utf-8'))
+        for entry in entries:
+            digest.update(f"{entry['fileName']}:{entry['signature']}".encode('utf-8'))
+        return f'"{digest.hexdigest()}"'
+
+    def query(self, filters, date_from=None, date_to=None, since=None, until=None, entries=None):
+        """Return price series matching the filters.
+
+        date_from / date_to restrict the term start date, since / until restrict the
+        scrape timestamps; all four are datetime.date objects or None. entries are the
+        find_files(filters) result if the caller already has it.
+        """
+        if entries is None:
+            entries = self.find_files(filters)
+
+        results = []
+        for entry in entries:
+            file_path = os.path.join(self.data_dir, entry['fileName'])
+            parsed = self.cache.get(file_path, entry['signature'])
+            if not parsed:
+                continue
+
+            # Oldest first, limited to the requested scrape window
+            columns = []
+            for i, timestamp in reversed(list(enumerate(parsed['timestamps']))):
+                try:
+                    day = parse_timestamp(timestamp.strip()).date()
+                except ValueError:
+                    continue
+                if (since and day < since) or (until and day > until):
+                    continue
+                columns.append((i, timestamp))
+
+            for term in parsed['terms']:
+                date_range = term['dateRange']
+                if filters.get('term') and date_range != filters['term']:
+                    continue
+                start = parse_date_from_term(date_range)
+                if date_from and (start is None or start < date_from):
+                    continue
+                if date_to and (start is None or start > date_to):
+                    continue
+
+                history = [
+                    {'timestamp': timestamp, 'price': term['prices'][i]}
+                    for i, timestamp in columns if term['prices'][i] is not None
+                ]
+                results.append({
+                    'country': entry['country'],
+                    'trip': entry['trip'],
+                    'airport': entry['airport'],
+                    'persons': entry['persons'],
+                    'fileName': entry['fileName'],
+                    'dateRange': date_range,
+                    'history': history,
+                })
+
+        return results
+
+    def list_files(self, filters, entries=None):
+        if entries is None:
+            entries = self.find_files(filters)
+        return [
+            {k: entry[k] for k in ('country', 'trip', 'airport', 'persons', 'fileName', 'terms')}
+            for entry in entries
+        ]
+
+
+def parse_query_args(params):
+    """Split HTTP/CLI parameters into index filters and date-range arguments."""
+    filters = {k: params[k] for k in FILTER_FIELDS if params.get(k) not in (None, '')}
+    ranges = {}
+    for param, arg in (('from', 'date_from'), ('to', 'date_to'), ('since', 'since'), ('until', 'until')):
+        if params.get(param):
+            ranges[arg] = parse_day(params[param])
+    return filters, ranges
+
+
+def make_handler(index):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if url.path == '/health':
+                cache = index.cache
+                return self.send_json({'status': 'ok', 'cacheEntries': len(cache.entries),
+                                       'cacheHits': cache.hits, 'cacheMisses': cache.misses})
+
+            if url.path not in ('/files', '/series'):
+                return self.send_json({'error': f'Unknown endpoint {url.path}'}, status=404)
+
+            try:
+                filters, ranges = parse_query_args(params)
+            except ValueError as e:
+                return self.send_json({'error': f'Invalid date, expected YYYY-MM-DD: {e}'}, status=400)
+
+            # One index scan per request, shared by the ETag and the response body
+            entries = index.find_files(filters)
+            etag = index.etag(entries, f"{url.path}?{url.query}")
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            if url.path == '/files':
+                body = {'files': index.list_files(filters, entries)}
+            else:
+                body = {'series': index.query(filters, **ranges, entries=entries)}
+            self.send_json(body, etag=etag)
+
+        def send_json(self, body, status=200, etag=None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return QueryHandler
+
+
+def add_filter_arguments(parser):
+    parser.add_argument('--country')
+    parser.add_argument('--trip')
+    parser.add_argument('--airport')
+    parser.add_argument('--persons', type=int)
+    parser.add_argument('--term', help="exact term, e.g. '04.11.2026 - 18.11.2026'")
+    parser.add_argument('--from', dest='from_', metavar='YYYY-MM-DD', help='earliest term start date')
+    parser.add_argument('--to', metavar='YYYY-MM-DD', help='latest term start date')
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help='earliest scrape date')
+    parser.add_argument('--until', metavar='YYYY-MM-DD', help='latest scrape date')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the stored price history.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='run a local read-only HTTP query server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+
+    query_parser = subparsers.add_parser('query', help='print matching price series as JSON')
+    add_filter_arguments(query_parser)
+    files_parser = subparsers.add_parser('files', help='print matching files and their terms as JSON')
+    add_filter_arguments(files_parser)
+
+    args = parser.parse_args()
+    index = PriceIndex(args.data_dir, load_sources(), getattr(args, 'cache_size', CACHE_SIZE))
+
+    if args.command == 'serve':
+        index.refresh()
+        print(f"Indexed {len(index.files)} CSV files from {args.data_dir}")
+        print(f"Serving on http://{args.host}:{args.port} (endpoints: /files, /series, /health)")
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    params = {k: getattr(args, k) for k in FILTER_FIELDS}
+    params.update({'from': args.from_, 'to': args.to, 'since': args.since, 'until': args.until})
+    try:
+        filters, ranges = parse_query_args(params)
+    except ValueError as e:
+        print(f"Invalid date, expected YYYY-MM-DD: {e}")
+        sys.exit(1)
+
+    if args.command == 'files':
+        result = index.list_files(filters)
+    else:
+        result = index.query(filters, **ranges)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Regression checks for processor.process_data.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RScraper"))
+
+import processor
+from scrape_state import get_state_file
+
+FILE_NAME = "Kraj__Wycieczka__Warszawa_Chopin__1os.csv"
+TERM = "01.06.2027 - 08.06.2027"
+
+
+class ProcessDataEmptyResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+        self.file_path = os.path.join(self.data_dir, FILE_NAME)
+        # Keep the price-matrix cache out of the repository's .cache directory
+        patcher = mock.patch.object(processor, 'write_price_matrix_from_prices')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def read_state(self):
+        state_file = get_state_file(self.data_dir)
+        if not os.path.exists(state_file):
+            return {}
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_empty_results_for_new_file(self):
+        self.assertFalse(processor.process_data([], self.file_path))
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertEqual(self.read_state(), {})
+
+    def test_empty_results_for_existing_file(self):
+        self.assertTrue(processor.process_data([(TERM, "4999")], self.file_path, timestamp="2027-01-01T06:00:00"))
+        with open(self.file_path, 'rb') as f:
+            content = f.read()
+        state = self.read_state()
+
+        self.assertFalse(processor.process_data([], self.file_path, timestamp="2027-01-02T06:00:00"))
+        with open(self.file_path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(self.read_state(), state)
+
+
+if __name__ == "__main__":
+    unittest.main()